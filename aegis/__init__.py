@@ -9,6 +9,9 @@ __all__ = [
     "BaseAuthenticator",
     "JWTAuth",
     "BasicAuth",
+    "AuthenticatorChain",
+    "APIKeyAuth",
+    "HMACAuth",
     "login_required",
     "permissions",
     "AuthException",
@@ -18,10 +21,16 @@ __all__ = [
     "InvalidRefreshTokenException",
     "ForbiddenException",
     "InvalidTokenException",
+    "ServiceUnavailableException",
+    "TokenRevokedException",
+    "TooManyRequestsException",
 ]
 from .authenticators.base import BaseAuthenticator
 from .authenticators.jwt import JWTAuth
 from .authenticators.basic import BasicAuth
+from .authenticators.chain import AuthenticatorChain
+from .authenticators.api_key import APIKeyAuth
+from .authenticators.signature import HMACAuth
 
 from .decorators import login_required, permissions
 
@@ -33,4 +42,7 @@ from .exceptions import (
     InvalidRefreshTokenException,
     ForbiddenException,
     InvalidTokenException,
+    ServiceUnavailableException,
+    TokenRevokedException,
+    TooManyRequestsException,
 )
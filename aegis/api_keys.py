@@ -0,0 +1,126 @@
+import hashlib
+import hmac
+import inspect
+import json
+import secrets
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Tuple,
+    Union,
+)
+
+APIKeyProvider = Callable[[], Union[list, Awaitable[list]]]
+
+
+class APIKeyStore:
+    """
+    API keys indexed by their public prefix.
+
+    A key looks like ``<prefix>.<secret>``. Only the SHA-256 digest of the
+    secret is stored, the prefix locates the entry with a dict lookup and
+    the digests are compared in constant time. The secrets are random, so
+    a fast digest is enough and no password hasher is needed.
+
+    Keys are loaded in bulk with `load`, e.g. on startup from a provider,
+    while `add` and `revoke` update the index of a running application.
+    Records have the form:
+
+        {"prefix": "<prefix>", "digest": "<hex>", "credentials": {...}}
+    """
+
+    separator = "."
+
+    def __init__(
+        self,
+        records: Optional[Iterable[dict]] = None,
+        provider: Optional[APIKeyProvider] = None,
+    ):
+        self.provider = provider
+        self._keys: Dict[str, Tuple[bytes, Any]] = {}
+        if records is not None:
+            self.load(records)
+
+    def __len__(self):
+        return len(self._keys)
+
+    def __contains__(self, prefix: str) -> bool:
+        return prefix in self._keys
+
+    @classmethod
+    def from_file(cls, path: str, **kwargs) -> "APIKeyStore":
+        with open(path) as records:
+            return cls(json.load(records), **kwargs)
+
+    @staticmethod
+    def digest(secret: str) -> bytes:
+        return hashlib.sha256(secret.encode()).digest()
+
+    def split(self, key: str) -> Tuple[str, str]:
+        """Returns the prefix and the secret of the key."""
+        prefix, _, secret = key.partition(self.separator)
+        return prefix, secret
+
+    def generate(self, credentials: Any) -> Tuple[str, dict]:
+        """
+        Creates a key for the credentials and adds it to the index. Returns
+        the key, which is shown once, and the record to persist.
+        """
+        prefix = secrets.token_hex(6)
+        while prefix in self._keys:
+            prefix = secrets.token_hex(6)
+        secret = secrets.token_urlsafe(32)
+        record = {
+            "prefix": prefix,
+            "digest": self.digest(secret).hex(),
+            "credentials": credentials,
+        }
+        self.add(record)
+        return f"{prefix}{self.separator}{secret}", record
+
+    @staticmethod
+    def _entry(record: dict) -> Tuple[bytes, Any]:
+        return bytes.fromhex(record["digest"]), record["credentials"]
+
+    def add(self, record: dict):
+        """Adds or replaces a single key."""
+        self._keys[record["prefix"]] = self._entry(record)
+
+    def revoke(self, prefix: str):
+        """Drops the key with the given prefix, it is rejected right away."""
+        self._keys.pop(prefix, None)
+
+    def load(self, records: Iterable[dict]):
+        """Replaces the index with the given records in a single assignment."""
+        self._keys = {record["prefix"]: self._entry(record) for record in records}
+
+    def lookup(self, key: str) -> Optional[Any]:
+        """Returns the credentials of the key or None if it is unknown or revoked."""
+        prefix, secret = self.split(key)
+        entry = self._keys.get(prefix)
+        if entry is None or not secret:
+            return None
+
+        digest, credentials = entry
+        if not hmac.compare_digest(self.digest(secret), digest):
+            return None
+        return credentials
+
+    def records(self) -> List[dict]:
+        """Returns the records of the index, e.g. to persist them."""
+        return [
+            {"prefix": prefix, "digest": digest.hex(), "credentials": credentials}
+            for prefix, (digest, credentials) in self._keys.items()
+        ]
+
+    async def refresh(self):
+        """Loads the records from the provider."""
+        records = self.provider()
+        if inspect.isawaitable(records):
+            records = await records
+        self.load(records)
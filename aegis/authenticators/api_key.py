@@ -0,0 +1,51 @@
+from typing import Optional
+
+from aiohttp import web
+
+from ..api_keys import APIKeyStore
+from ..exceptions import InvalidTokenException
+from .base import BaseAuthenticator
+
+
+class APIKeyAuth(BaseAuthenticator):
+    auth_endpoint = None
+    me_endpoint = None
+    auth_schema = "ApiKey"
+    decode_verifies_credentials = True
+    api_keys: Optional[APIKeyStore] = None
+
+    def __init__(self):
+        super().__init__()
+        if self.api_keys is None:
+            self.api_keys = APIKeyStore()
+
+    async def decode(self, token: str, verify=True) -> dict:
+        """Returns the credentials of the API key."""
+        credentials = self.api_keys.lookup(self.strip_scheme(token))
+        if credentials is None:
+            raise InvalidTokenException()
+        return dict(credentials) if isinstance(credentials, dict) else credentials
+
+    async def authenticate(self, request: web.Request):
+        raise NotImplementedError("API keys are issued with api_keys.generate.")
+
+    async def get_user(self, credentials) -> dict:
+        return credentials
+
+    def get_claimed_user(self, token: str) -> Optional[str]:
+        # failures are throttled by the public prefix of the key
+        try:
+            prefix, _ = self.api_keys.split(self.strip_scheme(token))
+        except InvalidTokenException:
+            return None
+        return prefix or None
+
+    def install(self, app):
+        super().install(app)
+
+        if self.api_keys.provider:
+
+            async def load_api_keys(app):
+                await self.api_keys.refresh()
+
+            app.on_startup.append(load_api_keys)
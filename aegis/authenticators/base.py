@@ -1,13 +1,37 @@
-import inspect
 from abc import ABCMeta, abstractmethod
-from typing import Callable, Hashable, Iterable, Union
+from typing import Callable, Hashable, Iterable, Mapping, Optional, Tuple, Union
 
 from aiohttp import web
 
-from ..exceptions import ForbiddenException
-from ..middlewares import auth_middleware
-from ..routes import make_auth_route, make_me_route
-from ..matching_algorithms import match_all, match_any, match_exact
+from ..caches import UserCache
+from ..exceptions import ForbiddenException, InvalidTokenException
+from ..instrumentation import Instrument
+from ..middlewares import make_auth_middleware
+from ..routes import ME_CACHE_TTL, make_auth_route, make_me_route
+from ..matching_algorithms import (
+    match_all,
+    match_any,
+    match_exact,
+    resolve_algorithm,
+)
+from ..policies import Policy, PolicyTable
+from ..scopes import ScopeRegistry
+from ..serializers import JSONDumps
+from ..throttling import SlidingWindowThrottle
+
+# request key of the parsed permissions of the user
+PERMISSIONS_KEY = "aegis_permissions"
+
+
+def split_authorization(header: str) -> Tuple[Optional[str], str]:
+    """
+    Splits an authorization header into its lowercased scheme and the
+    credentials. The scheme of a bare token without one is None.
+    """
+    scheme, separator, credentials = header.strip().partition(" ")
+    if not separator:
+        return None, scheme
+    return scheme.lower(), credentials.lstrip()
 
 
 class BaseAuthenticator(metaclass=ABCMeta):
@@ -15,6 +39,38 @@ class BaseAuthenticator(metaclass=ABCMeta):
     auth_endpoint: Union[str, None] = "/auth"
     auth_schema = None
     permission_key = "permissions"
+    scope_registry: Optional[ScopeRegistry] = None
+    instrument: Optional[Instrument] = None
+    # whether decode verifies the credentials, e.g. a token signature, so a
+    # cached user can be served without calling get_user
+    decode_verifies_credentials: bool = False
+    user_cache_key: Optional[str] = None
+    user_cache_ttl: float = 60
+    user_cache_size: int = 1024
+    user_cache: Optional[UserCache] = None
+    policies: Optional[Mapping[str, Union[str, Policy]]] = None
+    policy_table: Optional[PolicyTable] = None
+    lazy_user: bool = False
+    json_dumps: Optional[JSONDumps] = None
+    me_cache_size: int = 0
+    me_cache_ttl: float = ME_CACHE_TTL
+    throttle: Optional[SlidingWindowThrottle] = None
+
+    def __init__(self):
+        if self.policies is not None:
+            self.policy_table = PolicyTable(self.policies)
+        if self.user_cache_key is not None:
+            if not self.decode_verifies_credentials:
+                # a cached user would skip the password check of get_user
+                raise ValueError(
+                    f"{type(self).__name__} does not verify the credentials in "
+                    "decode, user_cache_key cannot be used."
+                )
+            self.user_cache = UserCache(
+                self.user_cache_key,
+                ttl=self.user_cache_ttl,
+                maxsize=self.user_cache_size,
+            )
 
     @staticmethod
     async def check_permissions(
@@ -23,18 +79,18 @@ class BaseAuthenticator(metaclass=ABCMeta):
         algorithm: Union[str, Callable] = "any",
     ) -> bool:
         # user tries to reach to a scoped end-point
-        if algorithm == "any":
+        # `permissions` resolves the algorithm names to callables beforehand
+        if callable(algorithm):
+            has_permission = algorithm(required_scopes, user_scopes)
+        elif algorithm == "any":
             has_permission = match_any(required=required_scopes, provided=user_scopes)
         elif algorithm == "all":
             has_permission = match_all(required=required_scopes, provided=user_scopes)
         elif algorithm == "exact":
             has_permission = match_exact(required=required_scopes, provided=user_scopes)
-        elif inspect.isfunction(algorithm):
-            has_permission = algorithm(required_scopes, user_scopes)
         else:
-            raise TypeError(
-                "Invalid algorithm type. " "Options 'all', 'any', 'exact', callable"
-            )
+            matcher = resolve_algorithm(algorithm)
+            has_permission = matcher(required_scopes, user_scopes)
         return has_permission
 
     @abstractmethod
@@ -48,22 +104,72 @@ class BaseAuthenticator(metaclass=ABCMeta):
     async def get_permissions(self, request: web.Request):
         if not hasattr(request, "user"):
             raise ForbiddenException()
-        return request.user.get(self.permission_key)
+
+        # permissions are parsed once per request and user
+        user = request.user
+        cached = request.get(PERMISSIONS_KEY)
+        if cached is not None and cached[0] is user:
+            return cached[1]
+
+        scopes = user.get(self.permission_key)
+        if scopes is not None:
+            if self.scope_registry is not None:
+                # encode once so the matchers only compare integers
+                scopes = self.scope_registry.encode(scopes)
+            else:
+                scopes = frozenset(scopes)
+
+        request[PERMISSIONS_KEY] = (user, scopes)
+        return scopes
 
     @abstractmethod
     async def get_user(self, credentials) -> dict:
         """Retrieve user with credentials"""
 
+    def strip_scheme(self, token: str) -> str:
+        """
+        Returns the credentials of the authorization header. Raises
+        `InvalidTokenException` if the header has another scheme.
+        """
+        scheme, credentials = split_authorization(token)
+        if scheme is not None and self.auth_schema is not None:
+            if scheme != self.auth_schema.lower():
+                raise InvalidTokenException()
+        return credentials
+
+    def get_claimed_user(self, token: str) -> Optional[str]:
+        """
+        Returns the user id the token claims to belong to without verifying
+        it. Failed attempts are throttled by this id as well as the address.
+        """
+        return None
+
+    def install(self, app):
+        """
+        Adds the routes and the hooks of the authenticator to the app,
+        the middleware and the me route are added by `setup`.
+        """
+        if self.auth_endpoint:
+            auth_route = make_auth_route(self)
+            app.router.add_post(self.auth_endpoint, auth_route)
+
     @classmethod
     def setup(cls, app):
-        app.middlewares.append(auth_middleware)
         authenticator = cls()
-        if authenticator.auth_endpoint:
-            auth_route = make_auth_route(authenticator)
-            app.router.add_post(authenticator.auth_endpoint, auth_route)
+        app.middlewares.append(make_auth_middleware(authenticator))
+        authenticator.install(app)
 
         if authenticator.me_endpoint:
-            me_route = make_me_route()
+            me_route = make_me_route(authenticator)
             app.router.add_get(authenticator.me_endpoint, me_route)
 
+        if authenticator.policy_table is not None:
+            authenticator.policy_table.bind(app.router)
+
+            async def bind_policies(app):
+                # routes might be added after the setup
+                authenticator.policy_table.bind(app.router)
+
+            app.on_startup.append(bind_policies)
+
         app["authenticator"] = authenticator
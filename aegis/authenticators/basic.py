@@ -1,11 +1,14 @@
 import base64
 import binascii
 from abc import abstractmethod
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 
 from aiohttp import web
 
-from aegis.exceptions import InvalidTokenException
+from aegis.caches import CredentialsCache
+from aegis.exceptions import InvalidTokenException, ServiceUnavailableException
+from aegis.executors import THREAD
+from aegis.hashers import PasswordHasher, PasswordHashingPool
 from .base import BaseAuthenticator
 
 
@@ -15,6 +18,31 @@ class BasicAuth(BaseAuthenticator):
     auth_endpoint = None
     me_endpoint = None
     auth_schema = "Basic"
+    credentials_cache_ttl: float = 0
+    credentials_cache_size: int = 1024
+    credentials_cache: Optional[CredentialsCache] = None
+    password_hasher: Optional[PasswordHasher] = None
+    password_hashing_mode: str = THREAD
+    password_hashing_workers: Optional[int] = None
+    password_hashing_max_pending: Optional[int] = 64
+    hashing_pool: Optional[PasswordHashingPool] = None
+
+    def __init__(self):
+        super().__init__()
+        if self.password_hasher is not None:
+            self.hashing_pool = PasswordHashingPool(
+                self.password_hasher,
+                mode=self.password_hashing_mode,
+                max_workers=self.password_hashing_workers,
+                max_pending=self.password_hashing_max_pending,
+            )
+        if self.credentials_cache_ttl > 0:
+            self.credentials_cache = CredentialsCache(
+                self.user_id,
+                ttl=self.credentials_cache_ttl,
+                maxsize=self.credentials_cache_size,
+                exclude=(self.password,),
+            )
 
     @abstractmethod
     async def authenticate(self, request: web.Request) -> Dict[str, Any]:
@@ -24,12 +52,55 @@ class BasicAuth(BaseAuthenticator):
         """Retrieve user with credentials."""
         return credentials
 
+    async def verify_password(self, credentials: dict, encoded: str) -> bool:
+        """
+        Verifies the password of the credentials against the encoded hash in
+        the hashing pool. Hashes made with outdated parameters are passed to
+        `update_password_hash` after a successful verification.
+        """
+        if self.hashing_pool is None:
+            raise NotImplementedError(
+                "password_hasher needs to be set in order to verify passwords."
+            )
+
+        password = credentials[self.password]
+        verified = await self.hashing_pool.verify(password, encoded)
+        if verified and self.hashing_pool.needs_rehash(encoded):
+            try:
+                new_hash = await self.hashing_pool.hash(password)
+            except ServiceUnavailableException:
+                # the hash will be upgraded on a later login
+                return verified
+            await self.update_password_hash(credentials[self.user_id], new_hash)
+        return verified
+
+    async def update_password_hash(self, user_id, encoded: str):
+        """Stores the password hash that was upgraded to the current parameters."""
+
+    def install(self, app):
+        super().install(app)
+
+        if self.hashing_pool is not None:
+
+            async def shutdown_hashing_pool(app):
+                self.hashing_pool.shutdown()
+
+            app.on_cleanup.append(shutdown_hashing_pool)
+
+    def get_claimed_user(self, token: str) -> Optional[str]:
+        try:
+            basic_token = self.strip_scheme(token).encode()
+            decoded_credentials = base64.b64decode(basic_token, validate=True).decode()
+        except (InvalidTokenException, binascii.Error, UnicodeDecodeError):
+            return None
+        return decoded_credentials.partition(":")[0] or None
+
     async def decode(self, token: str, verify=True) -> dict:
         """
         Decodes basic token and returns user's id and password as a dict.
         """
         try:
-            basic_token = token.replace(f"{self.auth_schema} ", "").encode()
+            basic_token = self.strip_scheme(token).encode()
 
             decoded_credentials = base64.b64decode(
                 basic_token, validate=verify
@@ -0,0 +1,74 @@
+from typing import Dict, Optional, Sequence, Type
+
+from aiohttp import web
+
+from ..exceptions import InvalidTokenException
+from .base import BaseAuthenticator, split_authorization
+
+
+class AuthenticatorChain(BaseAuthenticator):
+    """
+    Serves several authentication schemes, e.g. Bearer and Basic, in one
+    application. The scheme of the authorization header selects exactly
+    one of the `authenticators` with a dict lookup, headers with a scheme
+    nobody registered are rejected without decoding them.
+
+    Members decode their tokens and load their users, and they install
+    their own auth, refresh routes and hooks. Permissions, policies,
+    throttling and the me route are configured on the chain. A chain has
+    no user cache, some of its members may not verify the credentials
+    when decoding them, so setting `user_cache_key` raises `ValueError`.
+    """
+
+    authenticators: Sequence[Type[BaseAuthenticator]] = ()
+    auth_endpoint = None
+
+    def __init__(self):
+        super().__init__()
+        self.schemes: Dict[str, BaseAuthenticator] = {}
+        for authenticator_class in self.authenticators:
+            authenticator = authenticator_class()
+            name = authenticator_class.__name__
+            if not authenticator.auth_schema:
+                raise ValueError(f"{name} needs an auth_schema to be chained.")
+            scheme = authenticator.auth_schema.lower()
+            if scheme in self.schemes:
+                raise ValueError(f"{name} chains the {scheme!r} scheme twice.")
+            self.schemes[scheme] = authenticator
+
+    def select(self, token: str) -> BaseAuthenticator:
+        """
+        Returns the authenticator of the header's scheme. Raises
+        `InvalidTokenException` for unregistered schemes and bare tokens.
+        """
+        scheme, _ = split_authorization(token)
+        try:
+            return self.schemes[scheme]
+        except KeyError:
+            raise InvalidTokenException() from None
+
+    async def decode(self, token: str, verify=True) -> dict:
+        authenticator = self.select(token)
+        if verify:
+            return await authenticator.decode(token)
+        return await authenticator.decode(token, verify=False)
+
+    async def authenticate(self, request: web.Request):
+        raise NotImplementedError(
+            "Chained authenticators authenticate on their own auth_endpoint."
+        )
+
+    async def get_user(self, credentials) -> dict:
+        raise NotImplementedError(
+            "Chained authenticators load the users of their own credentials."
+        )
+
+    def get_claimed_user(self, token: str) -> Optional[str]:
+        try:
+            return self.select(token).get_claimed_user(token)
+        except InvalidTokenException:
+            return None
+
+    def install(self, app):
+        for authenticator in self.schemes.values():
+            authenticator.install(app)
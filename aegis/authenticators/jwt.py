@@ -1,14 +1,30 @@
+import logging
+import math
+import secrets
+import time
 from abc import abstractmethod
 from datetime import datetime, timedelta
-from typing import Any, Dict
+from typing import Any, Dict, Optional, Tuple
 
 import jwt
 from aiohttp import web
 
+from ..caches import FailedTokenCache, TokenCache
+from ..executors import INLINE, PROCESS, BatchExecutor
+from ..keys import KeySet, decode_token, export_key
+from ..refresh_tokens import RefreshTokenStore
+from ..revocation import RevocationList
 from ..routes import make_refresh_route
-from ..exceptions import InvalidTokenException, TokenExpiredException
+from ..exceptions import (
+    InvalidTokenException,
+    ServiceUnavailableException,
+    TokenExpiredException,
+    TokenRevokedException,
+)
 from .base import BaseAuthenticator
 
+logger = logging.getLogger(__name__)
+
 
 class JWTAuth(BaseAuthenticator):
     jwt_secret: str
@@ -16,28 +32,159 @@ class JWTAuth(BaseAuthenticator):
     jwt_algorithm: str = "HS256"
     refresh_token = False
     refresh_endpoint = "/auth/refresh"
+    refresh_resource: Optional[web.AbstractResource] = None
+    refresh_token_store: Optional[RefreshTokenStore] = None
+    refresh_token_ttl: float = 30 * 24 * 60 * 60
+    refresh_token_claim: str = "user_id"
+    user_claim: str = "user_id"
+    decode_verifies_credentials = True
     auth_schema = "Bearer"
+    token_cache_size: int = 0
+    token_cache: Optional[TokenCache] = None
+    failed_token_cache_size: int = 0
+    failed_token_cache_ttl: float = 60
+    expired_token_cache_ttl: float = 60 * 60
+    failed_token_cache: Optional[FailedTokenCache] = None
+    jwt_keys: Optional[KeySet] = None
+    execution_mode: str = INLINE
+    executor_workers: Optional[int] = None
+    inline_algorithms = frozenset(("HS256", "HS384", "HS512"))
+    executor: Optional[BatchExecutor] = None
+    revocation_list: Optional[RevocationList] = None
+
+    def __init__(self):
+        super().__init__()
+        if self.token_cache_size:
+            self.token_cache = TokenCache(self.token_cache_size)
+        if self.failed_token_cache_size:
+            self.failed_token_cache = FailedTokenCache(self.failed_token_cache_size)
+        if self.execution_mode != INLINE:
+            self.executor = BatchExecutor(self.execution_mode, self.executor_workers)
+        # picklable material of the parsed keys sent to process workers
+        self._exported_keys: Dict[int, Tuple[Any, Any]] = {}
 
     async def decode(self, jwt_token: str, verify=True) -> dict:
         """Decodes the given token and returns as a dict.
         Raises validation exceptions if verify is set to True."""
+        cache_key = payload = None
         try:
-            jwt_token = jwt_token.replace(f"{self.auth_schema} ", "")
-            payload = jwt.decode(
-                jwt_token,
-                self.jwt_secret,
-                algorithms=(self.jwt_algorithm,),
-                options={"verify_exp": verify},
-            )
+            jwt_token = self.strip_scheme(jwt_token)
 
-            return payload
+            # verified payloads are served from the cache without
+            # checking the signature again
+            if verify and self.token_cache is not None:
+                cache_key = self.token_cache.digest(jwt_token)
+                payload = self.token_cache.get(cache_key)
 
-        except jwt.DecodeError:
-            raise InvalidTokenException()
+            # and tokens that recently failed are rejected without parsing them
+            failed_token_cache = self.failed_token_cache
+            if payload is None and failed_token_cache is not None:
+                if cache_key is None:
+                    cache_key = TokenCache.digest(jwt_token)
+                failure = failed_token_cache.get(cache_key)
+                if failure is InvalidTokenException or (
+                    verify and failure is TokenExpiredException
+                ):
+                    raise failure()
+
+            if payload is None:
+                key, algorithm = await self.get_verification_key(jwt_token)
+                if self._runs_inline(algorithm):
+                    payload = jwt.decode(
+                        jwt_token,
+                        key,
+                        algorithms=(algorithm,),
+                        options={"verify_exp": verify},
+                    )
+                else:
+                    payload = await self._decode_offloaded(
+                        jwt_token, key, algorithm, {"verify_exp": verify}
+                    )
+
+                if verify and self.token_cache is not None:
+                    self.token_cache.set(cache_key, payload)
+
+            revocation_list = self.revocation_list
+            if revocation_list is not None and revocation_list.is_revoked(payload):
+                raise TokenRevokedException()
+
+            return payload
 
         except jwt.ExpiredSignatureError:
+            # an expired token never becomes valid again
+            self._cache_failure(cache_key, TokenExpiredException)
             raise TokenExpiredException()
 
+        except (jwt.DecodeError, jwt.InvalidAlgorithmError):
+            self._cache_failure(cache_key, InvalidTokenException)
+            raise InvalidTokenException()
+
+        except jwt.InvalidTokenError:
+            # e.g. a malformed kid header or a token that is not valid yet
+            raise InvalidTokenException()
+
+    async def _decode_offloaded(
+        self, jwt_token: str, key: Any, algorithm: str, options: dict
+    ) -> dict:
+        try:
+            if self.executor.mode == PROCESS:
+                # parsed keys cannot be pickled, workers parse the PEM once
+                return await self.executor.run(
+                    decode_token, jwt_token, self._export_key(key), algorithm, options
+                )
+            return await self.executor.run(
+                jwt.decode, jwt_token, key, algorithms=(algorithm,), options=options
+            )
+        except jwt.InvalidTokenError:
+            raise
+        except Exception as error:
+            # a broken pool is not the fault of the client
+            logger.exception("Failed to verify the token in the executor")
+            raise ServiceUnavailableException() from error
+
+    def _export_key(self, key: Any):
+        entry = self._exported_keys.get(id(key))
+        if entry is None or entry[0] is not key:
+            if len(self._exported_keys) >= 64:
+                # the keys have been reloaded, drop the replaced ones
+                self._exported_keys.clear()
+            entry = self._exported_keys[id(key)] = (key, export_key(key))
+        return entry[1]
+
+    def _cache_failure(self, cache_key: Optional[bytes], exception: type):
+        if self.failed_token_cache is None or cache_key is None:
+            return
+        ttl = (
+            self.expired_token_cache_ttl
+            if exception is TokenExpiredException
+            else self.failed_token_cache_ttl
+        )
+        self.failed_token_cache.set(cache_key, exception, ttl)
+
+    def get_claimed_user(self, jwt_token: str) -> Optional[str]:
+        try:
+            payload = jwt.decode(self.strip_scheme(jwt_token), verify=False)
+        except (InvalidTokenException, jwt.InvalidTokenError):
+            return None
+        user = payload.get(self.user_claim) if isinstance(payload, dict) else None
+        return None if user is None else str(user)
+
+    async def get_verification_key(self, jwt_token: str) -> Tuple[Any, str]:
+        """
+        Returns the key and the algorithm to verify the token with.
+        Keys are selected by the ``kid`` header if `jwt_keys` is set.
+        """
+        if self.jwt_keys is None:
+            return self.jwt_secret, self.jwt_algorithm
+
+        kid = jwt.get_unverified_header(jwt_token).get("kid")
+        entry = await self.jwt_keys.get_key(kid)
+        if entry is None:
+            raise InvalidTokenException()
+
+        algorithm, key = entry
+        return key, algorithm
+
     async def encode(self, payload: dict) -> str:
         """Encodes the given payload and returns as a string."""
         delta_seconds = self.duration
@@ -45,12 +192,28 @@ class JWTAuth(BaseAuthenticator):
             **payload,
             "exp": datetime.utcnow() + timedelta(seconds=delta_seconds),
         }
+        if self.revocation_list is not None:
+            # revocation needs the token id and the issuing time,
+            # refreshed tokens must not share the id of the old one
+            jwt_data["jti"] = secrets.token_urlsafe(16)
+            # in floored milliseconds, so a login right after revoke_user is
+            # newer than its watermark and an earlier one never is
+            jwt_data["iat"] = math.floor(time.time() * 1000) / 1000
 
-        jwt_token = jwt.encode(jwt_data, self.jwt_secret, self.jwt_algorithm)
+        if self._runs_inline(self.jwt_algorithm):
+            jwt_token = jwt.encode(jwt_data, self.jwt_secret, self.jwt_algorithm)
+        else:
+            jwt_token = await self.executor.run(
+                jwt.encode, jwt_data, self.jwt_secret, self.jwt_algorithm
+            )
         token = jwt_token.decode("utf-8")
 
         return token
 
+    def _runs_inline(self, algorithm: str) -> bool:
+        # cheap algorithms cost less than dispatching them to the executor
+        return self.executor is None or algorithm in self.inline_algorithms
+
     async def get_user(self, credentials) -> dict:
         return credentials
 
@@ -58,19 +221,52 @@ class JWTAuth(BaseAuthenticator):
     async def authenticate(self, request: web.Request) -> Dict[str, Any]:
         """Returns JSON serializable user"""
 
-    @classmethod
-    def setup(cls, app):
-        super().setup(app)
-        authenticator = app["authenticator"]
+    def install(self, app):
+        super().install(app)
+        if self.jwt_keys is not None and self.jwt_keys.provider:
+
+            async def load_keys(app):
+                await self.jwt_keys.refresh()
+
+            app.on_startup.append(load_keys)
+
+        revocation_list = self.revocation_list
+        if revocation_list is not None:
+            if revocation_list.max_token_age is None:
+                revocation_list.max_token_age = self.duration
+
+            if revocation_list.provider:
+
+                async def load_revocations(app):
+                    await revocation_list.refresh()
+
+                app.on_startup.append(load_revocations)
+
+        if self.executor is not None:
+
+            async def shutdown_executor(app):
+                self.executor.shutdown()
+
+            app.on_cleanup.append(shutdown_executor)
+
+        if self.refresh_token_store is not None:
+
+            async def close_refresh_token_store(app):
+                await self.refresh_token_store.close()
+
+            app.on_cleanup.append(close_refresh_token_store)
 
-        if authenticator.refresh_token:
-            if not hasattr(authenticator, "get_refresh_token"):
+        if self.refresh_token:
+            uses_store = self.refresh_token_store is not None
+            if not uses_store and not hasattr(self, "get_refresh_token"):
                 raise NotImplementedError(
                     (
                         "get_refresh_token method needs to be implemented"
                         "in order to use the refresh token feature."
                     )
                 )
-            app.router.add_post(
-                authenticator.refresh_endpoint, make_refresh_route(authenticator)
+            route = app.router.add_post(
+                self.refresh_endpoint, make_refresh_route(self)
             )
+            # the middleware recognizes refresh requests by their resource
+            self.refresh_resource = route.resource
@@ -0,0 +1,298 @@
+import asyncio
+import functools
+import hashlib
+import hmac
+import secrets
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Iterable, Optional
+
+
+class TokenCache:
+    """
+    Bounded LRU cache of verified token payloads.
+
+    Entries are keyed by the SHA-256 digest of the raw token, so the token
+    itself is never retained. An entry is dropped when the ``exp`` claim of
+    its payload passes or when it is the least recently used one and the
+    cache is full.
+    """
+
+    def __init__(self, maxsize: int = 1024):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    @staticmethod
+    def digest(token: str) -> bytes:
+        """Returns the cache key of the given raw token."""
+        return hashlib.sha256(token.encode()).digest()
+
+    def get(self, key: bytes) -> Optional[dict]:
+        """Returns a copy of the cached payload or None if it is missing or expired."""
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        payload, expires_at = entry
+        if expires_at is not None and expires_at <= time.time():
+            del self._entries[key]
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return dict(payload)
+
+    def set(self, key: bytes, payload: dict):
+        """Stores the verified payload and evicts the oldest entry if needed."""
+        if self.maxsize <= 0:
+            return
+        self._entries[key] = (dict(payload), payload.get("exp"))
+        self._entries.move_to_end(key)
+
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        """Drops all entries and resets the counters."""
+        self._entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+
+class FailedTokenCache:
+    """
+    Bounded LRU cache of the tokens that recently failed verification.
+
+    Entries are keyed by the same digest as `TokenCache` and keep the
+    exception class the token failed with until their own ttl passes.
+    The cache has its own size, so replaying or forging tokens can only
+    evict failed tokens, never the verified ones.
+    """
+
+    def __init__(self, maxsize: int = 1024):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key: bytes) -> Optional[type]:
+        """Returns the exception class of a failed token or None."""
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        exception, expires_at = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return exception
+
+    def set(self, key: bytes, exception: type, ttl: float):
+        """Stores the failure for `ttl` seconds and evicts the oldest entry if needed."""
+        if self.maxsize <= 0 or ttl <= 0:
+            return
+        self._entries[key] = (exception, time.monotonic() + ttl)
+        self._entries.move_to_end(key)
+
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        """Drops all entries and resets the counters."""
+        self._entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+
+class UserCache:
+    """
+    Caches the users returned by `get_user` by a field of the credentials.
+
+    Users expire after `ttl` seconds and the least recently used one is
+    evicted when the cache is full. Concurrent misses for the same user
+    share a single `get_user` call.
+    """
+
+    def __init__(self, key: str, ttl: float = 60, maxsize: int = 1024):
+        self.key = key
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._pending: Dict[Hashable, asyncio.Future] = {}
+
+    def __len__(self):
+        return len(self._entries)
+
+    async def get(self, credentials, loader: Callable[[Any], Awaitable[Any]]):
+        """Returns the cached user or loads it with the given loader."""
+        try:
+            key = credentials[self.key]
+        except (KeyError, TypeError):
+            return await loader(credentials)
+
+        entry = self._entries.get(key)
+        if entry is not None:
+            user, expires_at = entry
+            if expires_at > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return _copy(user)
+            del self._entries[key]
+
+        future = self._pending.get(key)
+        if future is None:
+            self.misses += 1
+            future = asyncio.ensure_future(loader(credentials))
+            future.add_done_callback(functools.partial(self._loaded, key))
+            self._pending[key] = future
+
+        return _copy(await asyncio.shield(future))
+
+    def _loaded(self, key: Hashable, future: asyncio.Future):
+        failed = future.cancelled() or future.exception() is not None
+
+        # the user might have been invalidated while it was loading
+        if self._pending.get(key) is not future:
+            return
+        del self._pending[key]
+
+        if failed:
+            return
+
+        user = future.result()
+        if user and self.maxsize > 0:
+            self._entries[key] = (user, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, key: Hashable):
+        """Drops the user with the given key, e.g. after it has been updated."""
+        self._entries.pop(key, None)
+        self._pending.pop(key, None)
+
+    def clear(self):
+        """Drops all users and resets the counters."""
+        self._entries.clear()
+        self._pending.clear()
+        self.hits = 0
+        self.misses = 0
+
+
+def _copy(user):
+    # handlers may alter request.user, keep the cached one intact
+    return dict(user) if isinstance(user, dict) else user
+
+
+class CredentialsCache:
+    """
+    Caches the users of successfully verified authorization headers.
+
+    Headers are identified by their HMAC with a per process secret, so
+    neither the header nor the password is retained. A part of the HMAC
+    locates the entry and the whole HMAC is compared in constant time.
+    Entries expire after `ttl` seconds and can be invalidated by the
+    `key` field of the credentials, e.g. after a password change.
+    """
+
+    def __init__(
+        self,
+        key: str,
+        ttl: float = 30,
+        maxsize: int = 1024,
+        exclude: Iterable[str] = (),
+    ):
+        self.key = key
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.exclude = frozenset(exclude)
+        self.hits = 0
+        self.misses = 0
+        self._secret = secrets.token_bytes(32)
+        self._entries = OrderedDict()
+        self._lookups_by_key: Dict[Hashable, set] = {}
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _digest(self, token: str) -> bytes:
+        return hmac.new(self._secret, token.encode(), hashlib.sha256).digest()
+
+    def get(self, token: str):
+        """Returns the user of a previously verified header or None."""
+        digest = self._digest(token)
+        lookup = digest[:16]
+        entry = self._entries.get(lookup)
+        if entry is None or not hmac.compare_digest(entry[0], digest):
+            self.misses += 1
+            return None
+
+        _, key, user, expires_at = entry
+        if expires_at <= time.monotonic():
+            self._remove(lookup)
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(lookup)
+        self.hits += 1
+        return _copy(user)
+
+    def set(self, token: str, credentials: dict, user):
+        """
+        Stores the user of a verified header and returns it without the
+        excluded fields such as the password.
+        """
+        if isinstance(user, dict) and self.exclude:
+            user = {k: v for k, v in user.items() if k not in self.exclude}
+        if self.maxsize <= 0:
+            return user
+
+        digest = self._digest(token)
+        lookup = digest[:16]
+        key = credentials.get(self.key)
+        self._remove(lookup)
+        self._entries[lookup] = (digest, key, user, time.monotonic() + self.ttl)
+        self._lookups_by_key.setdefault(key, set()).add(lookup)
+
+        while len(self._entries) > self.maxsize:
+            self._remove(next(iter(self._entries)))
+        return _copy(user)
+
+    def _remove(self, lookup: bytes):
+        entry = self._entries.pop(lookup, None)
+        if entry is None:
+            return
+        lookups = self._lookups_by_key.get(entry[1])
+        if lookups is not None:
+            lookups.discard(lookup)
+            if not lookups:
+                del self._lookups_by_key[entry[1]]
+
+    def invalidate(self, key: Hashable):
+        """Drops every cached header of the given user."""
+        for lookup in tuple(self._lookups_by_key.get(key, ())):
+            self._remove(lookup)
+
+    def clear(self):
+        """Drops all entries and resets the counters."""
+        self._entries.clear()
+        self._lookups_by_key.clear()
+        self.hits = 0
+        self.misses = 0
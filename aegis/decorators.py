@@ -4,6 +4,9 @@ from typing import Callable, Union
 from aiohttp import web
 
 from .exceptions import AuthRequiredException, ForbiddenException, AuthException
+from .instrumentation import INSTRUMENT_KEY, PERMISSIONS, timed
+from .matching_algorithms import resolve_algorithm
+from .middlewares import LazyUser, resolve_user
 
 
 def login_required(func):
@@ -16,13 +19,27 @@ def login_required(func):
         if not isinstance(request, web.Request):
             raise TypeError(f"Invalid Type '{type(request)}'")
 
-        if not getattr(request, "user", None):
+        user = getattr(request, "user", None)
+        if isinstance(user, LazyUser):
+            return _resolve_and_call(func, request)
+        if not user:
             return AuthRequiredException.make_response(request)
         return func(request)
 
     return wrapper
 
 
+async def _resolve_and_call(func, request: web.Request):
+    try:
+        user = await resolve_user(request)
+    except AuthException as e:
+        return e.make_response(request)
+
+    if not user:
+        return AuthRequiredException.make_response(request)
+    return await func(request)
+
+
 def permissions(
     *required_scopes: Union[set, tuple], algorithm="any"
 ) -> web.json_response:
@@ -32,21 +49,33 @@ def permissions(
     """
     assert required_scopes, "Cannot be used without any permission!"
 
+    # compile the requirements once instead of on every request
+    required = frozenset(required_scopes)
+    matcher = resolve_algorithm(algorithm)
+
+    async def authorize(request: web.Request):
+        await resolve_user(request)
+        authenticator = request.app["authenticator"]
+        provided_scopes = await authenticator.get_permissions(request)
+        has_permission = await authenticator.check_permissions(
+            provided_scopes, required, algorithm=matcher
+        )
+
+        if not has_permission:
+            raise ForbiddenException()
+
     def request_handler(view: Callable) -> Callable:
         @functools.wraps(view)
         async def wrapper(request: web.Request):
             if not isinstance(request, web.Request):
                 raise TypeError(f"Invalid Type '{type(request)}'")
 
-            authenticator = request.app["authenticator"]
+            instrument = request.get(INSTRUMENT_KEY)
             try:
-                provided_scopes = await authenticator.get_permissions(request)
-                has_permission = await authenticator.check_permissions(
-                    provided_scopes, required_scopes, algorithm=algorithm
-                )
-
-                if not has_permission:
-                    raise ForbiddenException()
+                if instrument is None:
+                    await authorize(request)
+                else:
+                    await timed(instrument, PERMISSIONS, authorize(request))
 
                 return await view(request)
 
@@ -1,5 +1,15 @@
+import json
+from json.encoder import encode_basestring_ascii
+from typing import Tuple
+
 from aiohttp import web
 
+from .serializers import get_json_dumps, json_response
+
+# stands in for the request url while the response template is compiled
+_URL_MARKER = "\ufffeurl\ufffe"
+_ESCAPED_URL_MARKER = encode_basestring_ascii(_URL_MARKER)[1:-1]
+
 
 class AuthException(Exception):
     status: int
@@ -9,10 +19,37 @@ class AuthException(Exception):
         """
         Creates a response based on exception schema.
         """
-        schema = cls.get_schema()
-        schema.update(kwargs)
-        payload = cls._format_schema(schema, url=request.url, status=cls.status)
-        return web.json_response(payload, status=cls.status)
+        if kwargs:
+            schema = cls.get_schema()
+            schema.update(kwargs)
+            payload = cls._format_schema(schema, url=request.url, status=cls.status)
+            dumps = get_json_dumps(request.app.get("authenticator"))
+            return json_response(payload, dumps, status=cls.status)
+
+        url = encode_basestring_ascii(str(request.url))[1:-1].encode()
+        body = url.join(cls._get_template())
+        return web.Response(
+            body=body,
+            status=cls.status,
+            content_type="application/json",
+            charset="utf-8",
+        )
+
+    @classmethod
+    def _get_template(cls) -> Tuple[bytes, ...]:
+        """
+        Returns the serialized response payload split at the url placeholders.
+        The schema is compiled once per exception class.
+        """
+        template = cls.__dict__.get("_template")
+        if template is None:
+            schema = cls._format_schema(
+                cls.get_schema(), url=_URL_MARKER, status=cls.status
+            )
+            body = json.dumps(schema)
+            template = tuple(part.encode() for part in body.split(_ESCAPED_URL_MARKER))
+            cls._template = template
+        return template
 
     @staticmethod
     def get_schema() -> dict:
@@ -144,3 +181,61 @@ class AuthenticationFailedException(AuthException):
             "instance": "{url}",
             "status": "{status}",
         }
+
+
+class ServiceUnavailableException(AuthException):
+    status = 503
+
+    @staticmethod
+    def get_schema() -> dict:
+        detail = "The server is too busy to authenticate you, please try again later."
+        doctype = (
+            "https://mgurdal.github.io/aegis/exceptions/"
+            "#ServiceUnavailableException"
+        )
+        return {
+            "type": doctype,
+            "title": "Service Unavailable",
+            "detail": detail,
+            "instance": "{url}",
+            "status": "{status}",
+        }
+
+
+class TokenRevokedException(AuthException):
+    """Raise exception if user uses a revoked token."""
+
+    status = 401
+
+    @staticmethod
+    def get_schema() -> dict:
+        detail = "The access token provided has been revoked."
+        doctype = "https://mgurdal.github.io/aegis/exceptions/#TokenRevokedException"
+
+        return {
+            "type": doctype,
+            "title": "Revoked Token",
+            "detail": detail,
+            "instance": "{url}",
+            "status": "{status}",
+        }
+
+
+class TooManyRequestsException(AuthException):
+    """Raise exception if the client failed to authenticate too many times."""
+
+    status = 429
+
+    @staticmethod
+    def get_schema() -> dict:
+        detail = "Too many failed authentication attempts, please try again later."
+        doctype = (
+            "https://mgurdal.github.io/aegis/exceptions/#TooManyRequestsException"
+        )
+        return {
+            "type": doctype,
+            "title": "Too Many Requests",
+            "detail": detail,
+            "instance": "{url}",
+            "status": "{status}",
+        }
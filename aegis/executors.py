@@ -0,0 +1,126 @@
+import asyncio
+import functools
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, List, Optional, Tuple
+
+INLINE = "inline"
+THREAD = "thread"
+PROCESS = "process"
+
+EXECUTION_MODES = (INLINE, THREAD, PROCESS)
+
+Call = Tuple[Callable, tuple, dict]
+
+
+def _run_batch(calls: List[Call]) -> List[Tuple[bool, Any]]:
+    """Runs the calls in a worker and returns their results or exceptions."""
+    results = []
+    for func, args, kwargs in calls:
+        try:
+            results.append((True, func(*args, **kwargs)))
+        except Exception as e:
+            results.append((False, e))
+    return results
+
+
+class WorkerPool:
+    """
+    Lazily started thread or process pool of `max_workers` workers, the
+    default of the pool if it is not set.
+    """
+
+    def __init__(self, mode: str = THREAD, max_workers: Optional[int] = None):
+        if mode not in (THREAD, PROCESS):
+            raise ValueError(
+                f"Invalid execution mode '{mode}'. Options 'thread', 'process'"
+            )
+        self.mode = mode
+        self.max_workers = max_workers
+        self._executor: Optional[Executor] = None
+
+    @property
+    def executor(self) -> Executor:
+        if self._executor is None:
+            pool = ThreadPoolExecutor if self.mode == THREAD else ProcessPoolExecutor
+            self._executor = pool(max_workers=self.max_workers)
+        return self._executor
+
+    @property
+    def workers(self) -> int:
+        """Number of workers, the CPU count if `max_workers` is not set."""
+        return self.max_workers or os.cpu_count() or 1
+
+    def shutdown(self, wait: bool = True):
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait)
+            self._executor = None
+
+
+class BatchExecutor(WorkerPool):
+    """
+    Runs CPU bound calls in a thread or a process pool.
+
+    Calls that arrive in the same event loop iteration are sent to the
+    pool together, split into one job per worker at most, so a burst of
+    requests pays the dispatching cost once per worker and still runs in
+    parallel. In the process mode the functions, their arguments and
+    results have to be picklable.
+    """
+
+    def __init__(
+        self,
+        mode: str = THREAD,
+        max_workers: Optional[int] = None,
+        max_batch_size: int = 32,
+    ):
+        super().__init__(mode, max_workers)
+        self.max_batch_size = max_batch_size
+        self._pending: List[Tuple[Call, asyncio.Future]] = []
+
+    async def run(self, func: Callable, *args, **kwargs) -> Any:
+        """Runs the function in the pool and returns its result."""
+        loop = asyncio.get_event_loop()
+        future = loop.create_future()
+        self._pending.append(((func, args, kwargs), future))
+
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif len(self._pending) == 1:
+            loop.call_soon(self._flush)
+
+        return await future
+
+    def _flush(self):
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+
+        loop = asyncio.get_event_loop()
+        # contiguous chunks, one job per worker so the batch runs in parallel
+        size = -(-len(batch) // self.workers)
+        for start in range(0, len(batch), size):
+            end = start + size
+            chunk = batch[start:end]
+            calls = [call for call, _ in chunk]
+            futures = [future for _, future in chunk]
+            job = loop.run_in_executor(self.executor, _run_batch, calls)
+            job.add_done_callback(functools.partial(self._resolve, futures=futures))
+
+    @staticmethod
+    def _resolve(job: asyncio.Future, futures: List[asyncio.Future]):
+        if job.cancelled():
+            results = [(False, asyncio.CancelledError())] * len(futures)
+        elif job.exception() is not None:
+            results = [(False, job.exception())] * len(futures)
+        else:
+            results = job.result()
+
+        for future, (succeeded, result) in zip(futures, results):
+            # the caller might have been cancelled in the meantime
+            if future.done():
+                continue
+            if succeeded:
+                future.set_result(result)
+            else:
+                future.set_exception(result)
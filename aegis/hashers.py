@@ -0,0 +1,172 @@
+import asyncio
+import base64
+import hashlib
+import hmac
+import os
+from typing import Any, Callable, Optional
+
+from .exceptions import ServiceUnavailableException
+from .executors import THREAD, WorkerPool
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.b64encode(data).decode("ascii").rstrip("=")
+
+
+def _b64decode(data: str) -> bytes:
+    return base64.b64decode(data + "=" * (-len(data) % 4))
+
+
+class PasswordHasher:
+    """
+    Base class of the password hashers.
+
+    Hashers are called in a worker pool, so they can block while hashing.
+    In the process mode the hasher has to be picklable.
+    """
+
+    algorithm: str
+
+    def hash(self, password: str) -> str:
+        """Returns the encoded hash of the password."""
+        raise NotImplementedError
+
+    def verify(self, password: str, encoded: str) -> bool:
+        """Returns whether the password matches the encoded hash."""
+        raise NotImplementedError
+
+    def needs_rehash(self, encoded: str) -> bool:
+        """Returns whether the hash was made with other parameters than the current ones."""
+        return False
+
+
+class PBKDF2Hasher(PasswordHasher):
+    """PBKDF2-HMAC-SHA256 hashes encoded as ``pbkdf2_sha256$iterations$salt$hash``."""
+
+    algorithm = "pbkdf2_sha256"
+
+    def __init__(self, iterations: int = 260000, salt_size: int = 16):
+        self.iterations = iterations
+        self.salt_size = salt_size
+
+    def _derive(self, password: str, salt: bytes, iterations: int) -> bytes:
+        return hashlib.pbkdf2_hmac("sha256", password.encode(), salt, iterations)
+
+    def hash(self, password: str) -> str:
+        salt = os.urandom(self.salt_size)
+        digest = self._derive(password, salt, self.iterations)
+        return f"{self.algorithm}${self.iterations}${_b64encode(salt)}${_b64encode(digest)}"
+
+    def _parse(self, encoded: str):
+        algorithm, iterations, salt, digest = encoded.split("$")
+        if algorithm != self.algorithm:
+            raise ValueError(algorithm)
+        return int(iterations), _b64decode(salt), _b64decode(digest)
+
+    def verify(self, password: str, encoded: str) -> bool:
+        try:
+            iterations, salt, digest = self._parse(encoded)
+        except (ValueError, TypeError):
+            return False
+        return hmac.compare_digest(self._derive(password, salt, iterations), digest)
+
+    def needs_rehash(self, encoded: str) -> bool:
+        try:
+            iterations, salt, _ = self._parse(encoded)
+        except (ValueError, TypeError):
+            return True
+        return iterations != self.iterations or len(salt) != self.salt_size
+
+
+class ScryptHasher(PasswordHasher):
+    """scrypt hashes encoded as ``scrypt$n$r$p$salt$hash``."""
+
+    algorithm = "scrypt"
+
+    def __init__(self, n: int = 2 ** 14, r: int = 8, p: int = 1, salt_size: int = 16):
+        self.n = n
+        self.r = r
+        self.p = p
+        self.salt_size = salt_size
+
+    @staticmethod
+    def _derive(password: str, salt: bytes, n: int, r: int, p: int) -> bytes:
+        # scrypt needs 128 * n * r bytes, leave some room above the default limit
+        maxmem = 256 * n * r
+        return hashlib.scrypt(
+            password.encode(), salt=salt, n=n, r=r, p=p, maxmem=maxmem, dklen=32
+        )
+
+    def hash(self, password: str) -> str:
+        salt = os.urandom(self.salt_size)
+        digest = self._derive(password, salt, self.n, self.r, self.p)
+        return (
+            f"{self.algorithm}${self.n}${self.r}${self.p}$"
+            f"{_b64encode(salt)}${_b64encode(digest)}"
+        )
+
+    def _parse(self, encoded: str):
+        algorithm, n, r, p, salt, digest = encoded.split("$")
+        if algorithm != self.algorithm:
+            raise ValueError(algorithm)
+        return int(n), int(r), int(p), _b64decode(salt), _b64decode(digest)
+
+    def verify(self, password: str, encoded: str) -> bool:
+        try:
+            n, r, p, salt, digest = self._parse(encoded)
+        except (ValueError, TypeError):
+            return False
+        return hmac.compare_digest(self._derive(password, salt, n, r, p), digest)
+
+    def needs_rehash(self, encoded: str) -> bool:
+        try:
+            n, r, p, salt, _ = self._parse(encoded)
+        except (ValueError, TypeError):
+            return True
+        return (n, r, p, len(salt)) != (self.n, self.r, self.p, self.salt_size)
+
+
+class PasswordHashingPool(WorkerPool):
+    """
+    Runs a password hasher in a bounded thread or process pool.
+
+    At most `max_pending` hashing jobs are admitted at a time, running or
+    waiting for a worker. Further jobs are rejected with
+    `ServiceUnavailableException` so that a login flood does not hold up
+    the rest of the application. `None` admits every job.
+    """
+
+    def __init__(
+        self,
+        hasher: PasswordHasher,
+        mode: str = THREAD,
+        max_workers: Optional[int] = None,
+        max_pending: Optional[int] = 64,
+    ):
+        super().__init__(mode, max_workers)
+        self.hasher = hasher
+        self.max_pending = max_pending
+        self.pending = 0
+
+    async def _run(self, func: Callable, *args) -> Any:
+        if self.max_pending is not None and self.pending >= self.max_pending:
+            raise ServiceUnavailableException()
+
+        self.pending += 1
+        loop = asyncio.get_event_loop()
+        job = loop.run_in_executor(self.executor, func, *args)
+        # the job keeps its worker even if the request goes away
+        job.add_done_callback(self._release)
+        return await asyncio.shield(job)
+
+    def _release(self, job: asyncio.Future):
+        self.pending -= 1
+
+    async def hash(self, password: str) -> str:
+        return await self._run(self.hasher.hash, password)
+
+    async def verify(self, password: str, encoded: str) -> bool:
+        return await self._run(self.hasher.verify, password, encoded)
+
+    def needs_rehash(self, encoded: str) -> bool:
+        return self.hasher.needs_rehash(encoded)
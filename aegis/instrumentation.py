@@ -0,0 +1,121 @@
+import bisect
+from time import perf_counter
+from typing import Awaitable, Dict, Optional, Sequence, Tuple, TypeVar
+
+T = TypeVar("T")
+
+# authentication stages
+DECODE = "decode"
+GET_USER = "get_user"
+PERMISSIONS = "permissions"
+ERROR_RESPONSE = "error_response"
+
+# outcome of the stages that completed without an exception,
+# failed stages are reported with the name of the exception class
+OK = "ok"
+
+# request key of the instrument that is active for the request
+INSTRUMENT_KEY = "aegis_instrument"
+
+
+class Instrument:
+    """
+    Base class of the instrumentation hooks.
+    Set an instance as the `instrument` of an authenticator to receive the
+    duration of each authentication stage with its outcome.
+    """
+
+    def record(self, stage: str, duration: float, outcome: str):
+        """Records a stage that took `duration` seconds."""
+
+
+async def timed(instrument: Instrument, stage: str, awaitable: Awaitable[T]) -> T:
+    """Awaits the given awaitable and records its duration as the given stage."""
+    started = perf_counter()
+    try:
+        result = await awaitable
+    except Exception as e:
+        instrument.record(stage, perf_counter() - started, type(e).__name__)
+        raise
+    instrument.record(stage, perf_counter() - started, OK)
+    return result
+
+
+class Histogram:
+    """Cumulative latency histogram with fixed bucket bounds in seconds."""
+
+    __slots__ = ("bounds", "counts", "count", "sum")
+
+    def __init__(self, bounds: Sequence[float]):
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Returns the upper bound of the bucket that contains the quantile."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.bounds, self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float("inf")
+
+    def to_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "buckets": dict(zip(map(str, self.bounds + ("+Inf",)), self.counts)),
+            "p50": self.quantile(0.5),
+            "p99": self.quantile(0.99),
+        }
+
+
+class HistogramCollector(Instrument):
+    """
+    Keeps an in-memory latency histogram of every stage and outcome.
+    `snapshot` returns a JSON serializable view for metrics endpoints.
+    """
+
+    default_bounds = (
+        0.00005,
+        0.0001,
+        0.00025,
+        0.0005,
+        0.001,
+        0.0025,
+        0.005,
+        0.01,
+        0.025,
+        0.05,
+        0.1,
+        0.25,
+        1.0,
+    )
+
+    def __init__(self, bounds: Optional[Sequence[float]] = None):
+        self.bounds = tuple(bounds or self.default_bounds)
+        self.histograms: Dict[Tuple[str, str], Histogram] = {}
+
+    def record(self, stage: str, duration: float, outcome: str):
+        histogram = self.histograms.get((stage, outcome))
+        if histogram is None:
+            histogram = self.histograms[stage, outcome] = Histogram(self.bounds)
+        histogram.observe(duration)
+
+    def snapshot(self) -> Dict[str, Dict[str, dict]]:
+        snapshot: Dict[str, Dict[str, dict]] = {}
+        for (stage, outcome), histogram in self.histograms.items():
+            snapshot.setdefault(stage, {})[outcome] = histogram.to_dict()
+        return snapshot
+
+    def reset(self):
+        self.histograms.clear()
@@ -0,0 +1,164 @@
+import asyncio
+import functools
+import inspect
+import json
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple, Union
+
+import jwt
+from jwt.algorithms import get_default_algorithms
+
+logger = logging.getLogger(__name__)
+
+KeyEntry = Tuple[str, Any]
+JWKSProvider = Callable[[], Union[dict, Awaitable[dict]]]
+
+
+def _get_algorithm(algorithm: str):
+    algorithms = get_default_algorithms()
+    if algorithm not in algorithms:
+        raise ValueError(f"Unsupported key algorithm '{algorithm}'.")
+    return algorithms[algorithm]
+
+
+def parse_jwk(jwk: dict, algorithm: Optional[str] = None) -> KeyEntry:
+    """
+    Parses a single JSON Web Key and returns its algorithm with the key object.
+    The algorithm is read from the ``alg`` member of the key if it is present.
+    """
+    algorithm = jwk.get("alg", algorithm)
+    key = _get_algorithm(algorithm).from_jwk(json.dumps(jwk))
+    return algorithm, key
+
+
+def parse_jwks(jwks: dict, algorithm: Optional[str] = None) -> Dict[str, KeyEntry]:
+    """Parses a JSON Web Key Set and returns its keys by their ``kid``."""
+    return {jwk["kid"]: parse_jwk(jwk, algorithm) for jwk in jwks["keys"]}
+
+
+def export_key(key: Any) -> Union[str, bytes]:
+    """
+    Returns picklable material of a key, e.g. for process workers. Parsed
+    `cryptography` keys are exported as PEM, secrets are returned as they are.
+    """
+    if isinstance(key, (str, bytes)):
+        return key
+
+    from cryptography.hazmat.primitives import serialization
+
+    if hasattr(key, "private_bytes"):
+        return key.private_bytes(
+            serialization.Encoding.PEM,
+            serialization.PrivateFormat.PKCS8,
+            serialization.NoEncryption(),
+        )
+    return key.public_bytes(
+        serialization.Encoding.PEM, serialization.PublicFormat.SubjectPublicKeyInfo
+    )
+
+
+@functools.lru_cache(maxsize=64)
+def _prepare_key(algorithm: str, material: Union[str, bytes]) -> Any:
+    # parsed once per worker process
+    return _get_algorithm(algorithm).prepare_key(material)
+
+
+def decode_token(
+    token: str, material: Union[str, bytes], algorithm: str, options: dict
+) -> dict:
+    """Decodes the token with exported key material, runs in process workers."""
+    key = _prepare_key(algorithm, material)
+    return jwt.decode(token, key, algorithms=(algorithm,), options=options)
+
+
+class KeySet:
+    """
+    Verification keys selected by the ``kid`` header of the tokens.
+
+    Keys are parsed once when they are loaded. Loading a new key set
+    replaces the previous one in a single assignment, so in-flight
+    requests keep using the keys they have already looked up.
+
+    When a provider is given, unknown key ids trigger a reload which
+    happens at most once every `refresh_interval` seconds. A failed reload
+    is logged and keeps the current keys.
+    """
+
+    def __init__(
+        self,
+        keys: Optional[Dict[str, KeyEntry]] = None,
+        provider: Optional[JWKSProvider] = None,
+        algorithm: Optional[str] = None,
+        refresh_interval: float = 60,
+    ):
+        self._keys: Dict[str, KeyEntry] = dict(keys or {})
+        self.provider = provider
+        self.algorithm = algorithm
+        self.refresh_interval = refresh_interval
+        self._refreshed_at = float("-inf")
+        self._refreshing: Optional[asyncio.Future] = None
+
+    def __len__(self):
+        return len(self._keys)
+
+    def __contains__(self, kid: str) -> bool:
+        return kid in self._keys
+
+    @classmethod
+    def from_jwks(cls, jwks: dict, **kwargs) -> "KeySet":
+        key_set = cls(**kwargs)
+        key_set.load_jwks(jwks)
+        return key_set
+
+    @classmethod
+    def from_file(cls, path: str, **kwargs) -> "KeySet":
+        with open(path) as jwks_file:
+            return cls.from_jwks(json.load(jwks_file), **kwargs)
+
+    def add_key(self, kid: str, algorithm: str, key: Any):
+        """Adds a PEM encoded or already parsed key."""
+        prepared_key = _get_algorithm(algorithm).prepare_key(key)
+        self._keys = {**self._keys, kid: (algorithm, prepared_key)}
+
+    def load_jwks(self, jwks: dict):
+        """Replaces the current keys with the keys of the given key set."""
+        self._keys = parse_jwks(jwks, self.algorithm)
+
+    def get(self, kid: str) -> Optional[KeyEntry]:
+        return self._keys.get(kid)
+
+    async def get_key(self, kid: str) -> Optional[KeyEntry]:
+        """Returns the key with the given id and reloads the keys if it is unknown."""
+        entry = self._keys.get(kid)
+        if entry is None and self.provider is not None:
+            if time.monotonic() - self._refreshed_at >= self.refresh_interval:
+                try:
+                    await self.refresh()
+                except Exception:
+                    # any client can send an unknown kid, an unavailable provider
+                    # rejects the token and the current keys stay in place
+                    logger.exception("Failed to refresh the key set")
+                    return None
+                entry = self._keys.get(kid)
+        return entry
+
+    async def refresh(self):
+        """
+        Loads the keys from the provider.
+        Concurrent calls share the same provider call.
+        """
+        if self._refreshing is None:
+            self._refreshing = asyncio.ensure_future(self._load())
+            self._refreshing.add_done_callback(self._refresh_done)
+        await asyncio.shield(self._refreshing)
+
+    def _refresh_done(self, future: asyncio.Future):
+        self._refreshing = None
+
+    async def _load(self):
+        self._refreshed_at = time.monotonic()
+        jwks = self.provider()
+        if inspect.isawaitable(jwks):
+            jwks = await jwks
+        self.load_jwks(jwks)
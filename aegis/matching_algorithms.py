@@ -1,18 +1,33 @@
-from typing import Hashable, Iterable
+import functools
+from typing import AbstractSet, Callable, FrozenSet, Hashable, Iterable, Union
+
+from .scopes import ScopeMask, ScopeTrie
+
+
+def _as_set(scopes: Iterable[Hashable]) -> AbstractSet[Hashable]:
+    # precompiled scopes are already sets, do not copy them again
+    if isinstance(scopes, (set, frozenset)):
+        return scopes
+    return set(scopes)
 
 
 def match_any(required: Iterable[Hashable], provided: Iterable[Hashable]) -> bool:
-    required_scopes = set(required)
-    provided_scopes = set(provided)
+    if isinstance(provided, ScopeMask):
+        return provided.bits & provided.registry.compile(required) != 0
 
-    scopes_matches = required_scopes.intersection(provided_scopes) != set()
+    required_scopes = _as_set(required)
+
+    scopes_matches = not required_scopes.isdisjoint(provided)
 
     return scopes_matches
 
 
 def match_exact(required: Iterable[Hashable], provided: Iterable[Hashable]) -> bool:
-    required_scopes = set(required)
-    provided_scopes = set(provided)
+    if isinstance(provided, ScopeMask):
+        return provided.bits == provided.registry.compile(required)
+
+    required_scopes = _as_set(required)
+    provided_scopes = _as_set(provided)
 
     scopes_matches = required_scopes == provided_scopes
 
@@ -20,9 +35,57 @@ def match_exact(required: Iterable[Hashable], provided: Iterable[Hashable]) -> b
 
 
 def match_all(required: Iterable[Hashable], provided: Iterable[Hashable]) -> bool:
-    required_scopes = set(required)
-    provided_scopes = set(provided)
+    if isinstance(provided, ScopeMask):
+        return provided.registry.compile(required) & ~provided.bits == 0
 
-    scopes_matches = required_scopes.issubset(provided_scopes)
+    required_scopes = _as_set(required)
+
+    scopes_matches = required_scopes.issubset(provided)
 
     return scopes_matches
+
+
+@functools.lru_cache(maxsize=256)
+def _compile_trie(required: FrozenSet[str]) -> ScopeTrie:
+    return ScopeTrie(required)
+
+
+def match_hierarchical(required: Iterable[str], provided: Iterable[str]) -> bool:
+    """
+    Matches if any of the provided scopes grants any of the required scopes.
+    Scopes are separated with ``:`` and a trailing ``*`` grants everything
+    below it, e.g. ``orders:*`` grants ``orders:read`` but not ``orders``.
+    A ``*`` in the middle matches a single segment.
+    """
+    try:
+        trie = _compile_trie(required)
+    except TypeError:
+        trie = ScopeTrie(required)
+
+    scopes_matches = any(trie.covers(scope) for scope in provided)
+
+    return scopes_matches
+
+
+ALGORITHMS = {
+    "any": match_any,
+    "all": match_all,
+    "exact": match_exact,
+    "hierarchical": match_hierarchical,
+}
+
+
+def resolve_algorithm(algorithm: Union[str, Callable]) -> Callable:
+    """
+    Returns the matching function of the given algorithm name.
+    Callables are returned as they are.
+    """
+    if callable(algorithm):
+        return algorithm
+    try:
+        return ALGORITHMS[algorithm]
+    except (KeyError, TypeError):
+        raise TypeError(
+            "Invalid algorithm type. "
+            "Options 'all', 'any', 'exact', 'hierarchical', callable"
+        )
@@ -1,40 +1,219 @@
-from typing import Callable
+import asyncio
+import functools
+from time import perf_counter
+from typing import Any, Awaitable, Callable, Optional
 
 from aiohttp import web
 
-from .exceptions import AuthException
+from .exceptions import AuthException, TooManyRequestsException
+from .instrumentation import (
+    DECODE,
+    ERROR_RESPONSE,
+    GET_USER,
+    INSTRUMENT_KEY,
+    PERMISSIONS,
+    timed,
+)
+from .throttling import SlidingWindowThrottle, make_error_response, throttle_keys
 
 
-@web.middleware
-async def auth_middleware(request: web.Request, handler: Callable):
-    """Handles token decoding, failed authorization responses,  """
-    authenticator = request.app.get("authenticator")
-    if not authenticator:
-        raise AttributeError(
-            (
-                "Please initialize the authenticator with "
-                "Authenticator.setup(app) first."
-            )
-        )
+class LazyUser:
+    """
+    Stands in for `request.user` until the user is needed. Awaiting it
+    decodes the token and loads the user once, failures are raised as
+    `AuthException`.
+    """
+
+    __slots__ = ("_load", "_future")
+
+    def __init__(self, load: Callable[[], Awaitable[Any]]):
+        self._load = load
+        self._future: Optional[asyncio.Future] = None
+
+    def __await__(self):
+        if self._future is None:
+            self._future = asyncio.ensure_future(self._load())
+        return self._future.__await__()
+
+
+async def resolve_user(request: web.Request):
+    """
+    Returns the user of the request and replaces a `LazyUser` with the
+    loaded one. Returns None for anonymous requests.
+    """
+    user = getattr(request, "user", None)
+    if isinstance(user, LazyUser):
+        user = await user
+        request.user = user
+    return user
+
+
+def make_auth_middleware(authenticator=None) -> Callable:
+    """
+    Creates the auth middleware. The optional features of the given
+    authenticator are resolved here once instead of on every request.
+    """
+    instrument = getattr(authenticator, "instrument", None)
+    user_cache = getattr(authenticator, "user_cache", None)
+    credentials_cache = getattr(authenticator, "credentials_cache", None)
+    policy_table = getattr(authenticator, "policy_table", None)
+    lazy_user = getattr(authenticator, "lazy_user", False)
+    throttle = getattr(authenticator, "throttle", None)
+    if not isinstance(throttle, SlidingWindowThrottle):
+        throttle = None
+
+    # chains dispatch each header to the authenticator of its scheme,
+    # which keeps its own credentials cache
+    schemes = getattr(authenticator, "schemes", None)
+    if isinstance(schemes, dict):
+        select = authenticator.select
+        credentials_caches = {
+            member: getattr(member, "credentials_cache", None)
+            for member in schemes.values()
+        }
+    else:
+        select = credentials_caches = None
+
+    if user_cache is None:
+
+        def load_user(authenticator, credentials):
+            return authenticator.get_user(credentials)
+
+    else:
 
-    token = request.headers.get("authorization")
+        def load_user(authenticator, credentials):
+            return user_cache.get(credentials, authenticator.get_user)
 
-    if token:
-        try:
-            user_trying_to_refresh = (
-                str(request.rel_url) == "/auth/refresh" and authenticator.refresh_token
+    async def verify(request, authenticator, token, credentials_cache):
+        refresh_resource = getattr(authenticator, "refresh_resource", None)
+        user_trying_to_refresh = (
+            refresh_resource is not None
+            and request.match_info.route.resource is refresh_resource
+        )
+        # authenticators that verify the whole request, e.g. its signature
+        decode_request = getattr(type(authenticator), "decode_request", None)
+        if decode_request is not None:
+            decoding = authenticator.decode_request(request, token)
+        elif user_trying_to_refresh:
+            decoding = authenticator.decode(token, verify=False)
+        else:
+            decoding = authenticator.decode(token)
+
+        if instrument is None:
+            credentials = await decoding
+            user = await load_user(authenticator, credentials)
+        else:
+            credentials = await timed(instrument, DECODE, decoding)
+            user = await timed(
+                instrument, GET_USER, load_user(authenticator, credentials)
             )
-            if user_trying_to_refresh:
-                credentials = await authenticator.decode(token, verify=False)
-            else:
-                credentials = await authenticator.decode(token)
 
-            request.user = await authenticator.get_user(credentials)
-            return await handler(request)
+        if credentials_cache is not None and user:
+            user = credentials_cache.set(token, credentials, user)
+        return user
 
-        except AuthException as ae:
-            return ae.make_response(request)
+    if throttle is None:
+        authenticate = verify
 
     else:
-        response = await handler(request)
+
+        async def authenticate(request, authenticator, token, credentials_cache):
+            # rejected before any signature check or password hash runs,
+            # the claimed user is parsed only while some user is throttled
+            claimed_user = None
+            if throttle.is_blocked(throttle_keys(request)):
+                raise TooManyRequestsException()
+            if throttle.tracks("user"):
+                claimed_user = authenticator.get_claimed_user(token)
+                if throttle.is_blocked(throttle_keys(request, claimed_user)[1:]):
+                    raise TooManyRequestsException()
+
+            try:
+                return await verify(request, authenticator, token, credentials_cache)
+            except AuthException as ae:
+                if ae.status == 401:
+                    if claimed_user is None:
+                        claimed_user = authenticator.get_claimed_user(token)
+                    throttle.record_failure(throttle_keys(request, claimed_user))
+                raise
+
+    def authorize(request, authenticator, policy):
+        if instrument is None:
+            return policy.authorize(request, authenticator)
+        return timed(instrument, PERMISSIONS, policy.authorize(request, authenticator))
+
+    def error_response(request, exception):
+        if instrument is None:
+            return make_error_response(request, exception, throttle)
+
+        started = perf_counter()
+        response = make_error_response(request, exception, throttle)
+        instrument.record(
+            ERROR_RESPONSE, perf_counter() - started, type(exception).__name__
+        )
         return response
+
+    @web.middleware
+    async def auth_middleware(request: web.Request, handler: Callable):
+        """Handles token decoding, failed authorization responses,  """
+        authenticator = request.app.get("authenticator")
+        if not authenticator:
+            raise AttributeError(
+                (
+                    "Please initialize the authenticator with "
+                    "Authenticator.setup(app) first."
+                )
+            )
+
+        policy = None if policy_table is None else policy_table.resolve(request)
+        if policy is not None and not policy.login:
+            # public routes do not need the user
+            return await handler(request)
+
+        if instrument is not None:
+            request[INSTRUMENT_KEY] = instrument
+
+        token = request.headers.get("authorization")
+
+        if token:
+            try:
+                verifier, cache = authenticator, credentials_cache
+                if select is not None:
+                    verifier = select(token)
+                    cache = credentials_caches[verifier]
+
+                user = None
+                if cache is not None:
+                    user = cache.get(token)
+                if user is None:
+                    if lazy_user and policy is None:
+                        user = LazyUser(
+                            functools.partial(
+                                authenticate, request, verifier, token, cache
+                            )
+                        )
+                    else:
+                        user = await authenticate(request, verifier, token, cache)
+                request.user = user
+
+                if policy is not None:
+                    await authorize(request, authenticator, policy)
+                return await handler(request)
+
+            except AuthException as ae:
+                return error_response(request, ae)
+
+        else:
+            if policy is not None:
+                try:
+                    await authorize(request, authenticator, policy)
+                except AuthException as ae:
+                    return error_response(request, ae)
+
+            response = await handler(request)
+            return response
+
+    return auth_middleware
+
+
+auth_middleware = make_auth_middleware()
@@ -0,0 +1,98 @@
+from typing import Callable, Dict, Hashable, Mapping, Optional, Union
+
+from aiohttp import web
+
+from .exceptions import AuthRequiredException, ForbiddenException
+from .matching_algorithms import resolve_algorithm
+
+PUBLIC = "public"
+LOGIN = "login"
+
+
+class Policy:
+    """
+    Requirement of a route. Public routes are served without decoding the
+    token, the others need a user and optionally the required scopes.
+    """
+
+    __slots__ = ("login", "required", "matcher")
+
+    def __init__(
+        self,
+        login: bool = True,
+        required: frozenset = frozenset(),
+        algorithm: Union[str, Callable] = "any",
+    ):
+        self.login = login or bool(required)
+        self.required = required
+        self.matcher = resolve_algorithm(algorithm) if required else None
+
+    async def authorize(self, request: web.Request, authenticator):
+        """Raises an `AuthException` if the request does not meet the policy."""
+        if not getattr(request, "user", None):
+            raise AuthRequiredException()
+
+        if self.required:
+            provided_scopes = await authenticator.get_permissions(request)
+            has_permission = await authenticator.check_permissions(
+                provided_scopes, self.required, algorithm=self.matcher
+            )
+            if not has_permission:
+                raise ForbiddenException()
+
+
+def scopes(*required_scopes: Hashable, algorithm="any") -> Policy:
+    """Policy of the routes that need the given scopes, like `permissions`."""
+    assert required_scopes, "Cannot be used without any permission!"
+    return Policy(required=frozenset(required_scopes), algorithm=algorithm)
+
+
+_NAMED_POLICIES = {PUBLIC: Policy(login=False), LOGIN: Policy()}
+
+
+def compile_policy(policy: Union[str, Policy]) -> Policy:
+    if isinstance(policy, Policy):
+        return policy
+    try:
+        return _NAMED_POLICIES[policy]
+    except (KeyError, TypeError):
+        raise ValueError(
+            f"Invalid policy {policy!r}. Options 'public', 'login', scopes(...)"
+        ) from None
+
+
+class PolicyTable:
+    """
+    Maps the resources of an application to their policies.
+
+    Policies are declared by route name or by the canonical path pattern,
+    e.g. ``/users/{id}``, and resolved once per resource. `bind` resolves
+    every registered resource up front.
+    """
+
+    def __init__(self, policies: Mapping[str, Union[str, Policy]]):
+        self.policies: Dict[str, Policy] = {
+            key: compile_policy(policy) for key, policy in policies.items()
+        }
+        self._resources: Dict[web.AbstractResource, Optional[Policy]] = {}
+
+    def _find(self, resource: web.AbstractResource) -> Optional[Policy]:
+        name = resource.name
+        if name is not None and name in self.policies:
+            return self.policies[name]
+        return self.policies.get(resource.canonical)
+
+    def bind(self, router: web.UrlDispatcher):
+        for resource in router.resources():
+            self._resources[resource] = self._find(resource)
+
+    def resolve(self, request: web.Request) -> Optional[Policy]:
+        """Returns the policy of the resource the request was routed to."""
+        resource = request.match_info.route.resource
+        if resource is None:
+            return None
+        try:
+            return self._resources[resource]
+        except KeyError:
+            policy = self._resources[resource] = self._find(resource)
+            return policy
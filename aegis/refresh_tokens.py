@@ -0,0 +1,289 @@
+import asyncio
+import hashlib
+import heapq
+import secrets
+import sqlite3
+import time
+from abc import ABCMeta, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Set, Tuple
+
+from .exceptions import InvalidRefreshTokenException
+
+
+class RefreshTokenStore(metaclass=ABCMeta):
+    """
+    Stores the refresh tokens by the SHA-256 digest of the token.
+
+    Every token belongs to a family that starts with a login. Using a
+    token rotates it, the token is marked as used and a new token of the
+    same family is returned. Using a token a second time means that it has
+    leaked, so the whole family is revoked.
+    """
+
+    @staticmethod
+    def digest(token: str) -> bytes:
+        return hashlib.sha256(token.encode()).digest()
+
+    @staticmethod
+    def new_token() -> str:
+        return secrets.token_urlsafe(32)
+
+    @abstractmethod
+    async def issue(self, subject: str, ttl: float) -> str:
+        """Starts a new token family for the subject and returns its first token."""
+
+    @abstractmethod
+    async def rotate(self, token: str, subject: str, ttl: float) -> str:
+        """
+        Marks the token as used and returns the next token of its family.
+        Raises `InvalidRefreshTokenException` if the token is unknown, expired,
+        belongs to another subject or has already been used.
+        """
+
+    @abstractmethod
+    async def revoke_subject(self, subject: str):
+        """Revokes every token of the subject, e.g. on logout or password change."""
+
+    @abstractmethod
+    async def prune(self) -> int:
+        """Drops the expired tokens and returns their count."""
+
+    async def close(self):
+        """Releases the resources of the store."""
+
+
+class _Entry:
+    __slots__ = ("subject", "family", "expires_at", "used")
+
+    def __init__(self, subject: str, family: str, expires_at: float):
+        self.subject = subject
+        self.family = family
+        self.expires_at = expires_at
+        self.used = False
+
+
+class InMemoryRefreshTokenStore(RefreshTokenStore):
+    """
+    Reference store that keeps the tokens in the process memory. Expired
+    tokens are pruned every `prune_interval` seconds while issuing tokens.
+    """
+
+    def __init__(self, prune_interval: float = 60):
+        self.prune_interval = prune_interval
+        self._tokens: Dict[bytes, _Entry] = {}
+        self._families: Dict[str, Set[bytes]] = {}
+        self._subjects: Dict[str, Set[str]] = {}
+        self._expirations: List[Tuple[float, bytes]] = []
+        self._pruned_at = time.time()
+
+    def __len__(self):
+        return len(self._tokens)
+
+    def _issue(self, subject: str, family: str, ttl: float, now: float) -> str:
+        if now - self._pruned_at >= self.prune_interval:
+            self._prune(now)
+
+        token = self.new_token()
+        digest = self.digest(token)
+        entry = _Entry(subject, family, now + ttl)
+        self._tokens[digest] = entry
+        self._families.setdefault(family, set()).add(digest)
+        self._subjects.setdefault(subject, set()).add(family)
+        heapq.heappush(self._expirations, (entry.expires_at, digest))
+        return token
+
+    async def issue(self, subject: str, ttl: float) -> str:
+        return self._issue(subject, secrets.token_hex(8), ttl, time.time())
+
+    async def rotate(self, token: str, subject: str, ttl: float) -> str:
+        # nothing is awaited between the check and the update
+        now = time.time()
+        entry = self._tokens.get(self.digest(token))
+        if entry is None or entry.expires_at <= now or entry.subject != subject:
+            raise InvalidRefreshTokenException()
+
+        if entry.used:
+            self._revoke_family(entry.family)
+            raise InvalidRefreshTokenException()
+
+        entry.used = True
+        return self._issue(subject, entry.family, ttl, now)
+
+    def _revoke_family(self, family: str):
+        for digest in self._families.pop(family, ()):
+            entry = self._tokens.pop(digest)
+            families = self._subjects.get(entry.subject)
+            if families is not None:
+                families.discard(family)
+                if not families:
+                    del self._subjects[entry.subject]
+
+    async def revoke_subject(self, subject: str):
+        for family in tuple(self._subjects.get(subject, ())):
+            self._revoke_family(family)
+
+    def _prune(self, now: float) -> int:
+        self._pruned_at = now
+        pruned = 0
+        expirations = self._expirations
+        while expirations and expirations[0][0] <= now:
+            _, digest = heapq.heappop(expirations)
+            entry = self._tokens.pop(digest, None)
+            if entry is None:
+                continue
+            pruned += 1
+            family = self._families[entry.family]
+            family.discard(digest)
+            if not family:
+                del self._families[entry.family]
+                families = self._subjects[entry.subject]
+                families.discard(entry.family)
+                if not families:
+                    del self._subjects[entry.subject]
+        return pruned
+
+    async def prune(self) -> int:
+        return self._prune(time.time())
+
+
+class SQLiteRefreshTokenStore(RefreshTokenStore):
+    """
+    Keeps the tokens in a SQLite database. Queries run on a single worker
+    thread and rotations run in immediate transactions, so a token is
+    rotated once even if several processes share the database.
+    """
+
+    schema = (
+        "CREATE TABLE IF NOT EXISTS aegis_refresh_tokens ("
+        " digest BLOB PRIMARY KEY,"
+        " subject TEXT NOT NULL,"
+        " family TEXT NOT NULL,"
+        " expires_at REAL NOT NULL,"
+        " used INTEGER NOT NULL DEFAULT 0"
+        ")",
+        "CREATE INDEX IF NOT EXISTS aegis_refresh_tokens_family"
+        " ON aegis_refresh_tokens (family)",
+        "CREATE INDEX IF NOT EXISTS aegis_refresh_tokens_subject"
+        " ON aegis_refresh_tokens (subject)",
+        "CREATE INDEX IF NOT EXISTS aegis_refresh_tokens_expires_at"
+        " ON aegis_refresh_tokens (expires_at)",
+    )
+
+    def __init__(self, path: str, prune_interval: float = 60):
+        self.path = path
+        self.prune_interval = prune_interval
+        self._pruned_at = time.time()
+        self._connection: Optional[sqlite3.Connection] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        if self._connection is None:
+            connection = sqlite3.connect(
+                self.path, isolation_level=None, check_same_thread=False
+            )
+            for statement in self.schema:
+                connection.execute(statement)
+            self._connection = connection
+        return self._connection
+
+    async def _run(self, func, *args):
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=1)
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(self._executor, func, *args)
+
+    @contextmanager
+    def _transaction(self):
+        connection = self.connection
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            yield connection
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        connection.execute("COMMIT")
+
+    def _insert(self, connection, subject: str, family: str, expires_at: float) -> str:
+        token = self.new_token()
+        connection.execute(
+            "INSERT INTO aegis_refresh_tokens (digest, subject, family, expires_at)"
+            " VALUES (?, ?, ?, ?)",
+            (self.digest(token), subject, family, expires_at),
+        )
+        return token
+
+    def _issue(self, subject: str, ttl: float) -> str:
+        now = time.time()
+        if now - self._pruned_at >= self.prune_interval:
+            self._prune(now)
+        with self._transaction() as connection:
+            return self._insert(connection, subject, secrets.token_hex(8), now + ttl)
+
+    async def issue(self, subject: str, ttl: float) -> str:
+        return await self._run(self._issue, subject, ttl)
+
+    def _rotate(self, token: str, subject: str, ttl: float) -> Optional[str]:
+        now = time.time()
+        digest = self.digest(token)
+        with self._transaction() as connection:
+            row = connection.execute(
+                "SELECT subject, family, expires_at, used FROM aegis_refresh_tokens"
+                " WHERE digest = ?",
+                (digest,),
+            ).fetchone()
+            if row is None:
+                return None
+            stored_subject, family, expires_at, used = row
+            if expires_at <= now or stored_subject != subject:
+                return None
+
+            if used:
+                connection.execute(
+                    "DELETE FROM aegis_refresh_tokens WHERE family = ?", (family,)
+                )
+                return None
+
+            connection.execute(
+                "UPDATE aegis_refresh_tokens SET used = 1 WHERE digest = ?", (digest,)
+            )
+            return self._insert(connection, subject, family, now + ttl)
+
+    async def rotate(self, token: str, subject: str, ttl: float) -> str:
+        new_token = await self._run(self._rotate, token, subject, ttl)
+        if new_token is None:
+            raise InvalidRefreshTokenException()
+        return new_token
+
+    def _revoke_subject(self, subject: str):
+        with self._transaction() as connection:
+            connection.execute(
+                "DELETE FROM aegis_refresh_tokens WHERE subject = ?", (subject,)
+            )
+
+    async def revoke_subject(self, subject: str):
+        await self._run(self._revoke_subject, subject)
+
+    def _prune(self, now: float) -> int:
+        self._pruned_at = now
+        with self._transaction() as connection:
+            cursor = connection.execute(
+                "DELETE FROM aegis_refresh_tokens WHERE expires_at <= ?", (now,)
+            )
+            return cursor.rowcount
+
+    async def prune(self) -> int:
+        return await self._run(self._prune, time.time())
+
+    def _close(self):
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+    async def close(self):
+        if self._executor is not None:
+            await self._run(self._close)
+            self._executor.shutdown()
+            self._executor = None
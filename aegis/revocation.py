@@ -0,0 +1,324 @@
+import asyncio
+import bisect
+import hashlib
+import inspect
+import json
+import logging
+import time
+from array import array
+from typing import (
+    Awaitable,
+    Callable,
+    Dict,
+    Hashable,
+    Iterator,
+    Mapping,
+    Optional,
+    Tuple,
+    Union,
+)
+
+logger = logging.getLogger(__name__)
+
+RevocationProvider = Callable[[], Union[dict, Awaitable[dict]]]
+
+# tokens merged between two event loop iterations
+MERGE_SLICE_SIZE = 4096
+
+
+def fingerprint(jti: str) -> int:
+    """Returns the 64 bit fingerprint a token id is stored with."""
+    return int.from_bytes(hashlib.blake2b(jti.encode(), digest_size=8).digest(), "big")
+
+
+class RevocationList:
+    """
+    Tokens revoked by their ``jti`` claim or by user with an issued-at
+    watermark, every token of the user issued before it is revoked.
+
+    Token ids are kept as 64 bit fingerprints in a sorted array with the
+    expiration of each token in a parallel array, 16 bytes per token.
+    Recent revocations are collected in a dict and merged into the arrays
+    in bulk by a background task, slice by slice, so lookups never wait
+    for the arrays to be rebuilt. Entries are purged once the tokens they
+    revoke have expired.
+
+    A snapshot of the list can be loaded from a JSON file or a provider:
+
+        {"tokens": {"<jti>": <exp>}, "users": {"<user>": <watermark>}}
+
+    With a provider the list is reloaded every `refresh_interval` seconds
+    in the background.
+    """
+
+    def __init__(
+        self,
+        provider: Optional[RevocationProvider] = None,
+        user_claim: str = "user_id",
+        max_token_age: Optional[float] = None,
+        refresh_interval: float = 60,
+        purge_interval: float = 60,
+        merge_threshold: int = 1024,
+    ):
+        self.provider = provider
+        self.user_claim = user_claim
+        # lifetime of the tokens, user watermarks are purged after it
+        self.max_token_age = max_token_age
+        self.refresh_interval = refresh_interval
+        self.purge_interval = purge_interval
+        self.merge_threshold = merge_threshold
+
+        self._ids = array("Q")
+        self._expirations = array("d")
+        self._next_expiration = float("inf")
+        self._recent: Dict[int, float] = {}
+        # revocations being merged into the arrays in the background
+        self._merging: Dict[int, float] = {}
+        self._merged: Optional[asyncio.Future] = None
+        self._generation = 0
+        # kept in the order of their expiration, purged from the front
+        self._users: Dict[str, Tuple[float, float]] = {}
+        self._purged_at = time.time()
+        self._refreshed_at = float("-inf") if provider is None else time.time()
+        self._refreshing: Optional[asyncio.Future] = None
+
+    def __len__(self):
+        merging = len(self._merging.keys() - self._recent.keys())
+        return len(self._ids) + len(self._recent) + merging + len(self._users)
+
+    @classmethod
+    def from_file(cls, path: str, **kwargs) -> "RevocationList":
+        revocation_list = cls(**kwargs)
+        with open(path) as revocations:
+            revocation_list.load(json.load(revocations))
+        return revocation_list
+
+    def _user_expiration(self, watermark: float) -> float:
+        if self.max_token_age is None:
+            return float("inf")
+        return watermark + self.max_token_age
+
+    def revoke(self, jti: str, expires_at: float):
+        """Revokes the token with the given id until it expires."""
+        key = fingerprint(jti)
+        self._recent[key] = max(expires_at, self._recent.get(key, expires_at))
+        # merging costs O(n), keep it amortized for large lists
+        if len(self._recent) >= max(self.merge_threshold, len(self._ids) // 4):
+            self._merge(time.time())
+
+    def revoke_user(self, user: Hashable, before: Optional[float] = None):
+        """
+        Revokes every token of the user issued until the given time, now by
+        default. Tokens issued at the watermark are revoked as well.
+        """
+        watermark = time.time() if before is None else before
+        key = str(user)
+        previous = self._users.pop(key, None)
+        if previous is not None and previous[0] > watermark:
+            watermark = previous[0]
+        # moved to the end, the latest watermark expires last
+        self._users[key] = (watermark, self._user_expiration(watermark))
+
+    def load(self, snapshot: Mapping):
+        """Replaces the revocations with the given snapshot."""
+        now = time.time()
+        tokens = sorted(
+            (fingerprint(jti), float(exp))
+            for jti, exp in snapshot.get("tokens", {}).items()
+            if exp > now
+        )
+        users = sorted(
+            (self._user_expiration(watermark), watermark, str(user))
+            for user, watermark in snapshot.get("users", {}).items()
+        )
+
+        self._ids, self._expirations = _build_arrays(tokens)
+        self._next_expiration = min(self._expirations, default=float("inf"))
+        self._recent = {}
+        self._merging = {}
+        # a merge in flight started from the replaced revocations
+        self._generation += 1
+        self._users = {
+            user: (watermark, expires_at)
+            for expires_at, watermark, user in users
+            if expires_at > now
+        }
+        self._purged_at = now
+
+    def is_revoked(self, payload: Mapping) -> bool:
+        """Returns whether the token with the given payload has been revoked."""
+        now = time.time()
+        if now - self._purged_at >= self.purge_interval:
+            self._purged_at = now
+            self._purge_users(now)
+            self._merge(now)
+        if self.provider is not None and now - self._refreshed_at >= self.refresh_interval:
+            self._refresh_in_background()
+
+        if self._users:
+            user = payload.get(self.user_claim)
+            entry = self._users.get(str(user)) if user is not None else None
+            # tokens without iat cannot prove they are newer than the watermark
+            if entry is not None and payload.get("iat", 0) <= entry[0]:
+                return True
+
+        jti = payload.get("jti")
+        if jti is None or not (self._ids or self._recent or self._merging):
+            return False
+
+        key = fingerprint(jti)
+        if key in self._recent or key in self._merging:
+            return True
+        ids = self._ids
+        index = bisect.bisect_left(ids, key)
+        return index < len(ids) and ids[index] == key
+
+    def purge(self, now: Optional[float] = None):
+        """
+        Drops the revocations of expired tokens right away, rebuilding the
+        arrays in one go. The list purges itself in the background every
+        `purge_interval` seconds.
+        """
+        now = time.time() if now is None else now
+        self._purged_at = now
+        self._purge_users(now)
+        recent = {**self._merging, **self._recent}
+        for key in self._merging.keys() & self._recent.keys():
+            recent[key] = max(self._merging[key], self._recent[key])
+        self._recent = {}
+
+        ids, expirations = array("Q"), array("d")
+        next_expiration = float("inf")
+        for earliest in _merge_slices(
+            self._ids, self._expirations, recent, now, ids, expirations
+        ):
+            next_expiration = min(next_expiration, earliest)
+        self._apply(ids, expirations, next_expiration)
+
+    def _purge_users(self, now: float):
+        users = self._users
+        while users:
+            user = next(iter(users))
+            if users[user][1] > now:
+                break
+            del users[user]
+
+    def _merge(self, now: float):
+        """Merges the recent revocations into the arrays in the background."""
+        if self._merged is not None:
+            return
+        if not self._recent and now < self._next_expiration:
+            return
+
+        loop = asyncio.get_event_loop()
+        if not loop.is_running():
+            self.purge(now)
+            return
+
+        # still looked up while the arrays are rebuilt
+        self._merging, self._recent = self._recent, {}
+        self._merged = asyncio.ensure_future(self._merge_in_background(now))
+        self._merged.add_done_callback(self._merge_done)
+
+    async def _merge_in_background(self, now: float):
+        generation = self._generation
+        ids, expirations = array("Q"), array("d")
+        next_expiration = float("inf")
+        for earliest in _merge_slices(
+            self._ids, self._expirations, self._merging, now, ids, expirations
+        ):
+            next_expiration = min(next_expiration, earliest)
+            await asyncio.sleep(0)
+
+        # a snapshot or a purge replaced the arrays in the meantime
+        if generation == self._generation:
+            self._apply(ids, expirations, next_expiration)
+
+    def _merge_done(self, future: asyncio.Future):
+        self._merged = None
+        if future.cancelled() or future.exception() is None:
+            return
+        logger.error("Failed to merge the revocation list", exc_info=future.exception())
+        for key, expires_at in self._merging.items():
+            self._recent[key] = max(expires_at, self._recent.get(key, expires_at))
+        self._merging = {}
+
+    def _apply(self, ids: array, expirations: array, next_expiration: float):
+        self._ids, self._expirations = ids, expirations
+        self._next_expiration = next_expiration
+        self._merging = {}
+        self._generation += 1
+
+    async def refresh(self):
+        """
+        Loads the revocations from the provider.
+        Concurrent calls share the same provider call.
+        """
+        if self._refreshing is None:
+            self._refreshing = asyncio.ensure_future(self._load())
+            self._refreshing.add_done_callback(self._refresh_done)
+        await asyncio.shield(self._refreshing)
+
+    def _refresh_in_background(self):
+        self._refreshed_at = time.time()
+        if self._refreshing is None:
+            self._refreshing = asyncio.ensure_future(self._load())
+            self._refreshing.add_done_callback(self._refresh_done)
+            self._refreshing.add_done_callback(self._log_failure)
+
+    def _refresh_done(self, future: asyncio.Future):
+        self._refreshing = None
+
+    @staticmethod
+    def _log_failure(future: asyncio.Future):
+        if not future.cancelled() and future.exception() is not None:
+            logger.error(
+                "Failed to refresh the revocation list", exc_info=future.exception()
+            )
+
+    async def _load(self):
+        self._refreshed_at = time.time()
+        snapshot = self.provider()
+        if inspect.isawaitable(snapshot):
+            snapshot = await snapshot
+        self.load(snapshot)
+
+
+def _build_arrays(tokens) -> Tuple[array, array]:
+    return array("Q", (key for key, _ in tokens)), array("d", (exp for _, exp in tokens))
+
+
+def _merge_slices(
+    ids: array,
+    expirations: array,
+    recent: Mapping[int, float],
+    now: float,
+    merged_ids: array,
+    merged_expirations: array,
+) -> Iterator[float]:
+    """
+    Merges the sorted arrays with the recent revocations into the given
+    arrays and drops the expired ones. Works in slices of MERGE_SLICE_SIZE
+    tokens and yields the earliest expiration kept after each slice.
+    """
+    recent_tokens = sorted(recent.items())
+    recent_ids = [key for key, _ in recent_tokens]
+    taken = 0
+    for start in range(0, len(ids), MERGE_SLICE_SIZE):
+        end = min(start + MERGE_SLICE_SIZE, len(ids))
+        # the recent ids up to the last id of the slice are merged with it
+        until = bisect.bisect_right(recent_ids, ids[end - 1], taken)
+        entries = dict(zip(ids[start:end], expirations[start:end]))
+        for key, expires_at in recent_tokens[taken:until]:
+            entries[key] = max(expires_at, entries.get(key, expires_at))
+        taken = until
+        yield _extend(merged_ids, merged_expirations, entries.items(), now)
+
+    yield _extend(merged_ids, merged_expirations, recent_tokens[taken:], now)
+
+
+def _extend(ids: array, expirations: array, tokens, now: float) -> float:
+    tokens = sorted(token for token in tokens if token[1] > now)
+    ids.extend(key for key, _ in tokens)
+    expirations.extend(exp for _, exp in tokens)
+    return min((exp for _, exp in tokens), default=float("inf"))
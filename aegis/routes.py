@@ -1,3 +1,7 @@
+import hashlib
+import time
+from collections import OrderedDict
+
 from aiohttp import web
 
 from .decorators import login_required
@@ -5,43 +9,135 @@ from .exceptions import (
     AuthException,
     InvalidRefreshTokenException,
     AuthenticationFailedException,
+    TooManyRequestsException,
 )
+from .refresh_tokens import RefreshTokenStore
+from .serializers import get_json_dumps, json_response, serialize
+from .throttling import SlidingWindowThrottle, make_error_response, throttle_keys
+
+# seconds a cached me response is served before the user is serialized again
+ME_CACHE_TTL = 5
 
 
 def make_auth_route(authenticator):
+    dumps = get_json_dumps(authenticator)
+    throttle = getattr(authenticator, "throttle", None)
+    if not isinstance(throttle, SlidingWindowThrottle):
+        throttle = None
+
+    async def authenticate(request: web.Request):
+        if throttle is None:
+            return await authenticator.authenticate(request)
+
+        keys = throttle_keys(request)
+        if throttle.is_blocked(keys):
+            raise TooManyRequestsException()
+        try:
+            user = await authenticator.authenticate(request)
+        except AuthException as ae:
+            if ae.status == 401:
+                throttle.record_failure(keys)
+            raise
+        if not user:
+            throttle.record_failure(keys)
+        return user
+
     async def auth_route(request: web.Request):
         """
         User authentication route.
         """
         try:
-            user = await authenticator.authenticate(request)
+            user = await authenticate(request)
             if not user:
                 raise AuthenticationFailedException()
             request.user = user
             token = await authenticator.encode(user)
             token_payload = {"access_token": token}
             if authenticator.refresh_token:
-                token_payload["refresh_token"] = await authenticator.get_refresh_token(
-                    request
+                token_payload["refresh_token"] = await get_refresh_token(
+                    authenticator, request
                 )
 
-            return web.json_response(token_payload, status=200)
+            return json_response(token_payload, dumps, status=200)
 
         except AuthException as ae:
-            return ae.make_response(request)
+            return make_error_response(request, ae, throttle)
 
     return auth_route
 
 
-def make_me_route():
+def make_me_route(authenticator=None):
+    dumps = get_json_dumps(authenticator)
+    cache_size = getattr(authenticator, "me_cache_size", 0)
+    if not isinstance(cache_size, int):
+        cache_size = 0
+    cache_ttl = getattr(authenticator, "me_cache_ttl", ME_CACHE_TTL)
+    if not isinstance(cache_ttl, (int, float)):
+        cache_ttl = ME_CACHE_TTL
+    # digest of the token -> (etag, body, expires at)
+    cache = OrderedDict()
+
     @login_required
     async def me_route(request: web.Request):
-        return web.json_response(request.user)
+        token = request.headers.get("authorization")
+        key = hashlib.sha256(token.encode()).digest() if cache_size and token else None
+
+        entry = cache.get(key) if key is not None else None
+        now = time.monotonic()
+        # the user may have changed since, e.g. after the user cache expired
+        if entry is None or entry[2] <= now:
+            body = serialize(request.user, dumps)
+            etag = f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+            if key is not None:
+                cache[key] = (etag, body, now + cache_ttl)
+                cache.move_to_end(key)
+                if len(cache) > cache_size:
+                    cache.popitem(last=False)
+        else:
+            cache.move_to_end(key)
+            etag, body, _ = entry
+
+        headers = {
+            "ETag": etag,
+            "Cache-Control": "private, no-cache",
+            "Vary": "Authorization",
+        }
+        if etag_matches(request.headers.get("if-none-match"), etag):
+            return web.Response(status=304, headers=headers)
+        return json_response(body, headers=headers)
 
     return me_route
 
 
+def etag_matches(if_none_match, etag: str) -> bool:
+    """Returns whether the If-None-Match header matches the ETag."""
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate in (etag, "*"):
+            return True
+    return False
+
+
+async def get_refresh_token(authenticator, request: web.Request) -> str:
+    store = getattr(authenticator, "refresh_token_store", None)
+    if not isinstance(store, RefreshTokenStore):
+        return await authenticator.get_refresh_token(request)
+
+    subject = str(request.user[authenticator.refresh_token_claim])
+    return await store.issue(subject, authenticator.refresh_token_ttl)
+
+
 def make_refresh_route(authenticator):
+    store = getattr(authenticator, "refresh_token_store", None)
+    if isinstance(store, RefreshTokenStore):
+        return make_rotating_refresh_route(authenticator, store)
+
+    dumps = get_json_dumps(authenticator)
+
     @login_required
     async def refresh_route(request: web.Request):
         refresh_valid = await authenticator.validate_refresh_token(request)
@@ -49,6 +145,33 @@ def make_refresh_route(authenticator):
             return InvalidRefreshTokenException.make_response(request)
 
         access_token = await authenticator.encode(request.user)
-        return web.json_response({"access_token": access_token})
+        return json_response({"access_token": access_token}, dumps)
+
+    return refresh_route
+
+
+def make_rotating_refresh_route(authenticator, store):
+    dumps = get_json_dumps(authenticator)
+
+    @login_required
+    async def refresh_route(request: web.Request):
+        try:
+            payload = await request.json()
+            provided_token = payload["refresh_token"]
+            subject = str(request.user[authenticator.refresh_token_claim])
+        except (ValueError, KeyError, TypeError):
+            return InvalidRefreshTokenException.make_response(request)
+
+        try:
+            refresh_token = await store.rotate(
+                provided_token, subject, authenticator.refresh_token_ttl
+            )
+        except AuthException as ae:
+            return ae.make_response(request)
+
+        access_token = await authenticator.encode(request.user)
+        return json_response(
+            {"access_token": access_token, "refresh_token": refresh_token}, dumps
+        )
 
     return refresh_route
@@ -0,0 +1,144 @@
+from typing import Dict, Hashable, Iterable, Iterator
+
+
+class ScopeRegistry:
+    """
+    Assigns every known scope a bit position so that scope sets can be
+    represented and matched as integer bitmasks.
+
+    Scopes are registered up front or the first time they are seen.
+    """
+
+    def __init__(self, scopes: Iterable[Hashable] = ()):
+        self._bits: Dict[Hashable, int] = {}
+        self._compiled: Dict[Hashable, int] = {}
+        self.register(*scopes)
+
+    def __len__(self):
+        return len(self._bits)
+
+    def bit(self, scope: Hashable) -> int:
+        """Returns the bit of the scope or 0 if it is not registered."""
+        return self._bits.get(scope, 0)
+
+    def register(self, *scopes: Hashable) -> int:
+        """Registers the given scopes and returns their combined bitmask."""
+        bits = self._bits
+        mask = 0
+        for scope in scopes:
+            bit = bits.get(scope)
+            if bit is None:
+                bit = bits[scope] = 1 << len(bits)
+            mask |= bit
+        return mask
+
+    def compile(self, required: Iterable[Hashable]) -> int:
+        """
+        Returns the bitmask of the required scopes.
+        Hashable scope sets such as the ones compiled by `permissions`
+        are encoded only once.
+        """
+        try:
+            return self._compiled[required]
+        except KeyError:
+            mask = self._compiled[required] = self.register(*required)
+            return mask
+        except TypeError:
+            return self.register(*required)
+
+    def encode(self, scopes: Iterable[Hashable]) -> "ScopeMask":
+        """Encodes the user's scopes into a `ScopeMask`."""
+        scopes = tuple(scopes)
+        return ScopeMask(self.register(*scopes), self, scopes)
+
+
+class ScopeMask:
+    """
+    User scopes encoded by a `ScopeRegistry`.
+
+    The built-in matching algorithms compare the mask with a single integer
+    operation. The mask still behaves as a collection of the original scopes
+    so custom matching algorithms keep working with it.
+    """
+
+    __slots__ = ("bits", "registry", "scopes")
+
+    def __init__(self, bits: int, registry: ScopeRegistry, scopes: tuple):
+        self.bits = bits
+        self.registry = registry
+        self.scopes = scopes
+
+    def __iter__(self) -> Iterator[Hashable]:
+        return iter(self.scopes)
+
+    def __len__(self):
+        return len(self.scopes)
+
+    def __contains__(self, scope: Hashable) -> bool:
+        return self.bits & self.registry.bit(scope) != 0
+
+    def __repr__(self):
+        return f"ScopeMask({self.scopes!r})"
+
+
+SCOPE_SEPARATOR = ":"
+SCOPE_WILDCARD = "*"
+
+# marks the end of a required scope in the trie
+_LEAF = object()
+
+
+class ScopeTrie:
+    """
+    Prefix trie of hierarchical scopes such as ``orders:read``.
+
+    A trailing ``*`` segment covers every scope strictly below its prefix,
+    so ``orders:*`` covers ``orders:read`` but not ``orders``. A ``*`` in
+    the middle matches a single segment, ``orders:*:read`` covers
+    ``orders:items:read`` but not ``orders:items:write``. Both apply to the
+    stored scopes and to the scopes that are looked up.
+    """
+
+    __slots__ = ("_root",)
+
+    def __init__(self, scopes: Iterable[str]):
+        self._root: dict = {}
+        for scope in scopes:
+            node = self._root
+            for part in scope.split(SCOPE_SEPARATOR):
+                node = node.setdefault(part, {})
+            node[_LEAF] = True
+
+    def covers(self, scope: str) -> bool:
+        """
+        Returns True if the scope grants any of the stored scopes.
+        Runs in time proportional to the depth of the scope unless the
+        scope has wildcards in the middle.
+        """
+        return _covers(self._root, scope.split(SCOPE_SEPARATOR), 0)
+
+
+def _covers(node: dict, parts: list, index: int) -> bool:
+    if index == len(parts):
+        return _LEAF in node
+
+    part = parts[index]
+    if part == SCOPE_WILDCARD:
+        if index == len(parts) - 1:
+            # any stored scope below the prefix, the prefix itself is not granted
+            return any(key is not _LEAF for key in node)
+        return any(
+            _covers(child, parts, index + 1)
+            for key, child in node.items()
+            if key is not _LEAF
+        )
+
+    child = node.get(part)
+    if child is not None and _covers(child, parts, index + 1):
+        return True
+
+    wildcard = node.get(SCOPE_WILDCARD)
+    if wildcard is None:
+        return False
+    # a stored trailing wildcard grants the rest of the scope
+    return _LEAF in wildcard or _covers(wildcard, parts, index + 1)
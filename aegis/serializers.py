@@ -0,0 +1,43 @@
+import json
+from typing import Any, Callable, Mapping, Optional, Union
+
+from aiohttp import web
+
+JSONDumps = Callable[[Any], Union[str, bytes]]
+
+
+def get_json_dumps(authenticator) -> JSONDumps:
+    """
+    Returns the `json_dumps` of the authenticator or `json.dumps`.
+    The serializer is read from the class, so plain functions such as
+    ``orjson.dumps`` can be assigned without `staticmethod`.
+    """
+    dumps = getattr(type(authenticator), "json_dumps", None)
+    return dumps if callable(dumps) else json.dumps
+
+
+def serialize(data: Any, dumps: JSONDumps = json.dumps) -> bytes:
+    """Serializes the data to bytes, pre-serialized bytes are returned as they are."""
+    if isinstance(data, (bytes, bytearray, memoryview)):
+        return data
+    body = dumps(data)
+    return body.encode() if isinstance(body, str) else body
+
+
+def json_response(
+    data: Any,
+    dumps: JSONDumps = json.dumps,
+    status: int = 200,
+    headers: Optional[Mapping[str, str]] = None,
+) -> web.Response:
+    """
+    Creates a JSON response with the given serializer.
+    Pre-serialized bytes are sent as they are.
+    """
+    return web.Response(
+        body=serialize(data, dumps),
+        status=status,
+        headers=headers,
+        content_type="application/json",
+        charset="utf-8",
+    )
@@ -0,0 +1,135 @@
+import hashlib
+import hmac
+import secrets
+import time
+from collections import OrderedDict
+from typing import Dict, Hashable, Iterable, Mapping, Optional, Set, Tuple
+
+from multidict import CIMultiDict
+
+SCHEME = "HMAC"
+EMPTY_BODY_DIGEST = hashlib.sha256().hexdigest()
+
+
+def canonical_request(
+    method: str,
+    path: str,
+    headers: Mapping[str, str],
+    signed_headers: Iterable[str],
+    body_digest: str,
+    timestamp: str,
+    nonce: str,
+) -> bytes:
+    """
+    Returns the string a request is signed with: the method, the path with
+    the query string, the timestamp, the nonce, the SHA-256 hex digest of
+    the body and the signed headers, one per line. Header names are looked
+    up as given, so pass a case-insensitive mapping.
+    """
+    lines = [method.upper(), path, timestamp, nonce, body_digest]
+    lines.extend(
+        f"{name.lower()}:{headers.get(name, '').strip()}" for name in signed_headers
+    )
+    return "\n".join(lines).encode()
+
+
+def compute_signature(secret: bytes, message: bytes) -> str:
+    return hmac.new(secret, message, hashlib.sha256).hexdigest()
+
+
+def parse_authorization(credentials: str) -> Dict[str, str]:
+    """Parses ``key_id=..,timestamp=..,nonce=..,signature=..`` into a dict."""
+    params = {}
+    for param in credentials.split(","):
+        name, separator, value = param.strip().partition("=")
+        if not separator:
+            raise ValueError(f"Invalid signature parameter {param!r}.")
+        params[name] = value
+    return params
+
+
+def split_signature(params: Mapping[str, str]) -> Tuple[str, str, str, str]:
+    """Returns the key id, the timestamp, the nonce and the signature."""
+    try:
+        return (
+            params["key_id"],
+            params["timestamp"],
+            params["nonce"],
+            params["signature"],
+        )
+    except KeyError as error:
+        raise ValueError(f"Missing signature parameter {error.args[0]!r}.") from None
+
+
+def sign_request(
+    key_id: str,
+    secret: bytes,
+    method: str,
+    path: str,
+    headers: Optional[Mapping[str, str]] = None,
+    body: bytes = b"",
+    signed_headers: Iterable[str] = (),
+    timestamp: Optional[float] = None,
+    nonce: Optional[str] = None,
+) -> str:
+    """Returns the authorization header of a request signed by a client."""
+    timestamp = str(int(time.time() if timestamp is None else timestamp))
+    nonce = secrets.token_urlsafe(16) if nonce is None else nonce
+    message = canonical_request(
+        method,
+        path,
+        CIMultiDict(headers or {}),
+        signed_headers,
+        hashlib.sha256(body).hexdigest(),
+        timestamp,
+        nonce,
+    )
+    signature = compute_signature(secret, message)
+    return (
+        f"{SCHEME} key_id={key_id},timestamp={timestamp},"
+        f"nonce={nonce},signature={signature}"
+    )
+
+
+class ReplayCache:
+    """
+    Nonces seen in the last `window` seconds.
+
+    Nonces are kept in buckets of `bucket_width` seconds by their arrival
+    time. A whole bucket is dropped in O(1) once it is older than the
+    window, so expiring nonces does not look at them one by one.
+    """
+
+    def __init__(self, window: float = 600, bucket_width: float = 30):
+        self.window = window
+        self.bucket_width = bucket_width
+        self._buckets: "OrderedDict[int, Set[Hashable]]" = OrderedDict()
+
+    def __len__(self):
+        return sum(len(bucket) for bucket in self._buckets.values())
+
+    def add(self, nonce: Hashable, now: Optional[float] = None) -> bool:
+        """Records the nonce, returns False if it has already been seen."""
+        now = time.time() if now is None else now
+        buckets = self._buckets
+        current = int(now // self.bucket_width)
+        if buckets:
+            # keep the buckets in order if the clock goes back
+            current = max(current, next(reversed(buckets)))
+
+        # a bucket expires once its last second has left the window
+        oldest = int((now - self.window) // self.bucket_width)
+        while buckets and next(iter(buckets)) < oldest:
+            buckets.popitem(last=False)
+
+        if any(nonce in bucket for bucket in buckets.values()):
+            return False
+
+        bucket = buckets.get(current)
+        if bucket is None:
+            bucket = buckets[current] = set()
+        bucket.add(nonce)
+        return True
+
+    def clear(self):
+        self._buckets.clear()
@@ -0,0 +1,126 @@
+import time
+from collections import Counter, OrderedDict
+from typing import Hashable, Iterable, Optional, Tuple
+
+from aiohttp import web
+
+from .exceptions import AuthException, TooManyRequestsException
+
+
+class SlidingWindowThrottle:
+    """
+    Counts failed authentication attempts per key, e.g. client address or
+    claimed user id, in a sliding window of `window` seconds.
+
+    The window is approximated with the counts of the current and the
+    previous fixed window, so a key costs three numbers. Keys are evicted
+    when they have been idle for two windows or when more than `maxsize`
+    keys are tracked, the least recently failed first. Keys may be tuples
+    of a kind and a value, e.g. ``("user", "1")``, and the throttle counts
+    the tracked keys of each kind.
+    """
+
+    def __init__(self, limit: int = 10, window: float = 60, maxsize: int = 65536):
+        self.limit = limit
+        self.window = window
+        self.maxsize = maxsize
+        # key -> [window start, previous count, current count]
+        self._counters = OrderedDict()
+        self._kinds = Counter()
+
+    def __len__(self):
+        return len(self._counters)
+
+    def tracks(self, kind: Hashable) -> bool:
+        """Returns whether any key of the given kind is counted."""
+        return self._kinds[kind] > 0
+
+    def _discard(self, key: Hashable):
+        if self._counters.pop(key, None) is not None and isinstance(key, tuple):
+            self._kinds[key[0]] -= 1
+
+    def _roll(self, counter: list, now: float):
+        periods = (now - counter[0]) // self.window
+        if periods == 1:
+            counter[:] = [counter[0] + self.window, counter[2], 0]
+        elif periods > 1:
+            counter[:] = [now, 0, 0]
+
+    def count(self, key: Hashable, now: Optional[float] = None) -> float:
+        """Returns the estimated number of failures in the last window."""
+        counter = self._counters.get(key)
+        if counter is None:
+            return 0
+        now = time.monotonic() if now is None else now
+        self._roll(counter, now)
+        start, previous, current = counter
+        return previous * (1 - (now - start) / self.window) + current
+
+    def is_blocked(self, keys: Iterable[Hashable]) -> bool:
+        """Returns whether any of the keys has reached the limit."""
+        if not self._counters:
+            return False
+        now = time.monotonic()
+        return any(self.count(key, now) >= self.limit for key in keys)
+
+    def record_failure(self, keys: Iterable[Hashable]):
+        now = time.monotonic()
+        counters = self._counters
+        for key in keys:
+            counter = counters.get(key)
+            if counter is None:
+                counter = counters[key] = [now, 0, 0]
+                if isinstance(key, tuple):
+                    self._kinds[key[0]] += 1
+            else:
+                self._roll(counter, now)
+                counters.move_to_end(key)
+            counter[2] += 1
+
+        self._evict(now)
+
+    def _evict(self, now: float):
+        counters = self._counters
+        while len(counters) > self.maxsize:
+            self._discard(next(iter(counters)))
+
+        # the least recently failed keys come first
+        idle = 2 * self.window
+        while counters:
+            key, counter = next(iter(counters.items()))
+            if now - counter[0] < idle:
+                break
+            self._discard(key)
+
+    def reset(self, keys: Iterable[Hashable]):
+        for key in keys:
+            self._discard(key)
+
+    def clear(self):
+        self._counters.clear()
+        self._kinds.clear()
+
+
+def throttle_keys(
+    request: web.Request, claimed_user: Optional[str] = None
+) -> Tuple[Hashable, ...]:
+    """Returns the throttling keys of the client address and the claimed user."""
+    keys: Tuple[Hashable, ...] = (("address", request.remote),)
+    if claimed_user is not None:
+        keys += (("user", claimed_user),)
+    return keys
+
+
+def make_error_response(
+    request: web.Request,
+    exception: AuthException,
+    throttle: Optional[SlidingWindowThrottle] = None,
+) -> web.Response:
+    """
+    Creates the response of the exception, throttled clients are told to
+    retry after the window of the throttle.
+    """
+    response = exception.make_response(request)
+    if throttle is not None and isinstance(exception, TooManyRequestsException):
+        response.headers["Retry-After"] = str(int(throttle.window))
+    return response
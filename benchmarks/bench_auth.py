@@ -0,0 +1,335 @@
+"""
+Hot path benchmarks for aegis.
+
+Runs the middleware, decorators and authenticators both in-process and
+through a local aiohttp server, and reports ops/sec with p50/p99 latencies
+as JSON so that the results of two releases can be compared.
+
+    python benchmarks/bench_auth.py --output results.json
+    python benchmarks/bench_auth.py --compare results.json
+"""
+import argparse
+import asyncio
+import base64
+import json
+import platform
+import random
+import statistics
+import sys
+import time
+from typing import Awaitable, Callable, Dict, List
+
+import aiohttp
+from aiohttp import web
+from aiohttp.test_utils import TestServer, make_mocked_request
+
+import aegis
+from aegis import BasicAuth, JWTAuth, login_required, permissions
+
+SECRET = "benchmark-secret"
+SCOPE_COUNTS = (1, 50, 300)
+HEADER_PADDINGS = (0, 2048)
+FAILURE_RATIOS = (0.0, 0.5)
+
+
+class BenchJWTAuth(JWTAuth):
+    jwt_secret = SECRET
+
+    async def authenticate(self, request: web.Request) -> dict:
+        return {"user_id": 1}
+
+
+class BenchBasicAuth(BasicAuth):
+    async def authenticate(self, request: web.Request) -> dict:
+        return {}
+
+
+async def ok_view(request: web.Request) -> web.Response:
+    return web.Response(text="ok")
+
+
+@login_required
+async def login_view(request: web.Request) -> web.Response:
+    return web.Response(text="ok")
+
+
+@permissions("scope-0", "admin", algorithm="any")
+async def permission_view(request: web.Request) -> web.Response:
+    return web.Response(text="ok")
+
+
+def make_scopes(count: int) -> List[str]:
+    return [f"scope-{i}" for i in range(count)]
+
+
+async def make_tokens(
+    authenticator: JWTAuth, scopes: int, padding: int, failure_ratio: float, size=64
+) -> List[str]:
+    """Returns bearer tokens where the given ratio of them is forged."""
+    payload = {"user_id": 1, "permissions": make_scopes(scopes), "pad": "x" * padding}
+    token = await authenticator.encode(payload)
+    forged = token[:-4] + ("AAAA" if not token.endswith("AAAA") else "BBBB")
+
+    failures = int(size * failure_ratio)
+    tokens = [f"Bearer {forged}"] * failures + [f"Bearer {token}"] * (size - failures)
+    random.Random(size).shuffle(tokens)
+    return tokens
+
+
+async def measure(
+    operation: Callable[[int], Awaitable], iterations: int, warmup: int
+) -> Dict[str, float]:
+    for i in range(warmup):
+        await operation(i)
+
+    timings = []
+    started = time.perf_counter()
+    for i in range(iterations):
+        op_started = time.perf_counter()
+        await operation(i)
+        timings.append(time.perf_counter() - op_started)
+    elapsed = time.perf_counter() - started
+
+    timings.sort()
+    return {
+        "ops_per_sec": iterations / elapsed,
+        "p50_us": statistics.median(timings) * 1e6,
+        "p99_us": timings[min(len(timings) - 1, int(len(timings) * 0.99))] * 1e6,
+    }
+
+
+def make_app(authenticator_class, *routes) -> web.Application:
+    app = web.Application()
+    for path, view in routes:
+        app.router.add_get(path, view)
+    authenticator_class.setup(app)
+    return app
+
+
+def get_auth_middleware(app: web.Application):
+    return [m for m in app.middlewares if m.__name__ == "auth_middleware"][0]
+
+
+def in_process_benchmarks():
+    """Yields the name, parameters and operation factory of each benchmark."""
+    for scopes in SCOPE_COUNTS:
+        for padding in HEADER_PADDINGS:
+            for failure_ratio in FAILURE_RATIOS:
+                params = {
+                    "scopes": scopes,
+                    "header_padding": padding,
+                    "failure_ratio": failure_ratio,
+                }
+                yield "jwt_decode", params, jwt_decode
+                yield "auth_middleware_login_required", params, middleware_login
+                yield "auth_middleware_permissions", params, middleware_permissions
+
+    for failure_ratio in FAILURE_RATIOS:
+        yield "basic_decode", {"failure_ratio": failure_ratio}, basic_decode
+
+
+async def jwt_decode(params):
+    authenticator = BenchJWTAuth()
+    tokens = await make_tokens(
+        authenticator, params["scopes"], params["header_padding"], params["failure_ratio"]
+    )
+
+    async def operation(i):
+        try:
+            await authenticator.decode(tokens[i % len(tokens)])
+        except aegis.AuthException:
+            pass
+
+    return operation
+
+
+async def _middleware_operation(params, path, view):
+    app = make_app(BenchJWTAuth, (path, view))
+    middleware = get_auth_middleware(app)
+    tokens = await make_tokens(
+        app["authenticator"],
+        params["scopes"],
+        params["header_padding"],
+        params["failure_ratio"],
+    )
+    requests = [
+        make_mocked_request("GET", path, headers={"Authorization": token}, app=app)
+        for token in tokens
+    ]
+
+    async def operation(i):
+        await middleware(requests[i % len(requests)], view)
+
+    return operation
+
+
+async def middleware_login(params):
+    return await _middleware_operation(params, "/login", login_view)
+
+
+async def middleware_permissions(params):
+    return await _middleware_operation(params, "/permissions", permission_view)
+
+
+async def basic_decode(params):
+    authenticator = BenchBasicAuth()
+    valid = "Basic " + base64.b64encode(b"user:password").decode()
+    size = 64
+    failures = int(size * params["failure_ratio"])
+    tokens = ["Basic !!invalid!!"] * failures + [valid] * (size - failures)
+    random.Random(size).shuffle(tokens)
+
+    async def operation(i):
+        try:
+            await authenticator.decode(tokens[i % len(tokens)])
+        except aegis.AuthException:
+            pass
+
+    return operation
+
+
+async def run_server_benchmarks(iterations: int, warmup: int, concurrency: int):
+    """Drives the protected routes through a local aiohttp server."""
+    results = []
+    app = make_app(
+        BenchJWTAuth,
+        ("/public", ok_view),
+        ("/login", login_view),
+        ("/permissions", permission_view),
+    )
+    server = TestServer(app)
+    await server.start_server()
+    try:
+        async with aiohttp.ClientSession() as session:
+            for scopes in SCOPE_COUNTS:
+                for failure_ratio in FAILURE_RATIOS:
+                    tokens = await make_tokens(
+                        app["authenticator"], scopes, 0, failure_ratio
+                    )
+                    for path in ("/public", "/login", "/permissions"):
+                        url = str(server.make_url(path))
+
+                        async def request(i, url=url, tokens=tokens):
+                            headers = {"Authorization": tokens[i % len(tokens)]}
+                            async with session.get(url, headers=headers) as resp:
+                                await resp.read()
+
+                        async def operation(i, request=request):
+                            await asyncio.gather(
+                                *(request(i + n) for n in range(concurrency))
+                            )
+
+                        stats = await measure(operation, iterations, warmup)
+                        # every operation runs `concurrency` requests
+                        stats["ops_per_sec"] *= concurrency
+                        params = {
+                            "path": path,
+                            "scopes": scopes,
+                            "failure_ratio": failure_ratio,
+                            "concurrency": concurrency,
+                        }
+                        results.append(
+                            {"name": "server_request", "params": params, **stats}
+                        )
+    finally:
+        await server.close()
+    return results
+
+
+async def run(args) -> dict:
+    results = []
+    for name, params, factory in in_process_benchmarks():
+        if args.filter and args.filter not in name:
+            continue
+        operation = await factory(params)
+        stats = await measure(operation, args.iterations, args.warmup)
+        results.append({"name": name, "params": params, **stats})
+        print_result(results[-1])
+
+    if args.server and (not args.filter or args.filter in "server_request"):
+        server_results = await run_server_benchmarks(
+            max(1, args.iterations // 10), max(1, args.warmup // 10), args.concurrency
+        )
+        for result in server_results:
+            print_result(result)
+        results.extend(server_results)
+
+    return {
+        "aegis": aegis.__version__,
+        "python": platform.python_version(),
+        "aiohttp": aiohttp.__version__,
+        "iterations": args.iterations,
+        "results": results,
+    }
+
+
+def result_key(result: dict) -> str:
+    params = ",".join(f"{k}={v}" for k, v in sorted(result["params"].items()))
+    return f"{result['name']}[{params}]"
+
+
+def print_result(result: dict, file=sys.stderr):
+    print(
+        f"{result_key(result):<90} {result['ops_per_sec']:>12.0f} ops/s "
+        f"p50 {result['p50_us']:>9.1f}us p99 {result['p99_us']:>9.1f}us",
+        file=file,
+    )
+
+
+def compare(baseline: dict, current: dict, threshold: float) -> bool:
+    """Prints the throughput change of each benchmark and returns False on regressions."""
+    previous = {result_key(result): result for result in baseline["results"]}
+    passed = True
+    for result in current["results"]:
+        key = result_key(result)
+        if key not in previous:
+            continue
+        change = result["ops_per_sec"] / previous[key]["ops_per_sec"] - 1
+        regressed = change < -threshold
+        passed = passed and not regressed
+        marker = "REGRESSION" if regressed else ""
+        print(f"{key:<90} {change:>+8.1%} {marker}", file=sys.stderr)
+    return passed
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--warmup", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--filter", help="only run benchmarks containing this name")
+    parser.add_argument(
+        "--no-server",
+        dest="server",
+        action="store_false",
+        help="skip the benchmarks that go through a local server",
+    )
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    parser.add_argument("--compare", help="compare the results with a previous run")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.1,
+        help="throughput drop reported as regression, 0.1 is 10%%",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    report = asyncio.get_event_loop().run_until_complete(run(args))
+
+    if args.output:
+        with open(args.output, "w") as output:
+            json.dump(report, output, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+
+    if args.compare:
+        with open(args.compare) as baseline:
+            if not compare(json.load(baseline), report, args.threshold):
+                sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
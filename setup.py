@@ -21,6 +21,8 @@ VERSION = "1.1.0"
 
 REQUIRED = ["aiohttp", "PyJWT"]
 
+EXTRAS = {"crypto": ["PyJWT[crypto]"]}
+
 here = os.path.abspath(os.path.dirname(__file__))
 
 with io.open(os.path.join(here, "README.rst"), encoding="utf-8") as f:
@@ -50,6 +52,7 @@ setup(
     url=URL,
     packages=find_packages(exclude=("tests", "tests")),
     install_requires=REQUIRED,
+    extras_require=EXTRAS,
     include_package_data=True,
     license="Apache 2",
     classifiers=[
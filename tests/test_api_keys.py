@@ -0,0 +1,89 @@
+import json
+
+import pytest
+from aiohttp import web
+from asynctest import CoroutineMock
+
+from aegis import APIKeyAuth, InvalidTokenException
+from aegis.api_keys import APIKeyStore
+
+
+async def test_store_looks_up_generated_keys():
+    store = APIKeyStore()
+
+    key, record = store.generate({"client": "billing"})
+
+    prefix, secret = store.split(key)
+    assert record["prefix"] == prefix
+    assert secret not in json.dumps(record)
+    assert store.lookup(key) == {"client": "billing"}
+    assert store.lookup(f"{prefix}.wrong") is None
+    assert store.lookup(prefix) is None
+    assert store.lookup("unknown.secret") is None
+
+
+async def test_store_loads_records_in_bulk_and_revokes_keys():
+    source = APIKeyStore()
+    first, _ = source.generate({"client": "first"})
+    second, _ = source.generate({"client": "second"})
+
+    store = APIKeyStore(source.records())
+    assert len(store) == 2
+    assert store.lookup(first) == {"client": "first"}
+
+    store.revoke(store.split(first)[0])
+    assert store.lookup(first) is None
+    assert store.lookup(second) == {"client": "second"}
+
+    store.add(source.records()[0])
+    assert store.lookup(first) == {"client": "first"}
+
+
+async def test_store_loads_records_from_file(tmp_path):
+    source = APIKeyStore()
+    key, _ = source.generate({"client": "billing"})
+    path = tmp_path / "api_keys.json"
+    path.write_text(json.dumps(source.records()))
+
+    store = APIKeyStore.from_file(str(path))
+
+    assert store.lookup(key) == {"client": "billing"}
+
+
+class KeyAuth(APIKeyAuth):
+    pass
+
+
+async def test_api_key_auth_decodes_keys_of_its_scheme():
+    authenticator = KeyAuth()
+    key, _ = authenticator.api_keys.generate({"client": "billing"})
+
+    assert await authenticator.decode(f"ApiKey {key}") == {"client": "billing"}
+    assert authenticator.get_claimed_user(f"ApiKey {key}") == key.split(".")[0]
+    with pytest.raises(InvalidTokenException):
+        await authenticator.decode(f"ApiKey {key}x")
+    with pytest.raises(InvalidTokenException):
+        await authenticator.decode(f"Bearer {key}")
+
+
+async def test_api_key_auth_loads_keys_on_startup(aiohttp_client):
+    source = APIKeyStore()
+    key, _ = source.generate({"client": "billing"})
+    provider = CoroutineMock(return_value=source.records())
+
+    async def view(request):
+        return web.json_response(request.user)
+
+    class ProvidedKeyAuth(APIKeyAuth):
+        api_keys = APIKeyStore(provider=provider)
+
+    app = web.Application()
+    app.router.add_get("/", view)
+    ProvidedKeyAuth.setup(app)
+    client = await aiohttp_client(app)
+
+    resp = await client.get("/", headers={"Authorization": f"ApiKey {key}"})
+
+    provider.assert_awaited_once()
+    assert resp.status == 200
+    assert await resp.json() == {"client": "billing"}
@@ -1,5 +1,7 @@
 from unittest.mock import MagicMock, patch
 
+from aiohttp.test_utils import make_mocked_request
+
 import pytest
 
 from aegis import ForbiddenException
@@ -103,7 +105,8 @@ async def test_check_permissions_handles_invalid_algorithm():
         )
 
     assert str(te.value) == (
-        "Invalid algorithm type. Options 'all', 'any', 'exact', callable"
+        "Invalid algorithm type. "
+        "Options 'all', 'any', 'exact', 'hierarchical', callable"
     )
 
 
@@ -125,7 +128,7 @@ async def test_get_scopes_returns_user_permissions_with_default_key():
 
     scopes = await auth.get_permissions(mock_request)
 
-    assert scopes == ("test",)
+    assert scopes == frozenset(("test",))
 
 
 async def test_get_scopes_returns_user_permissions_with_altered_key():
@@ -167,3 +170,51 @@ async def test_get_scopes_raises_forbidden_if_user_is_not_available():
     with pytest.raises(ForbiddenException):
         mock_request = object()
         await auth.get_permissions(mock_request)
+
+
+class MemoBaseAuth(BaseAuthenticator):
+    async def decode(self, token: str) -> dict:
+        pass
+
+    async def get_user(self, credentials) -> dict:
+        pass
+
+    async def authenticate(self, request):
+        pass
+
+
+async def test_get_permissions_parses_permissions_once_per_request():
+    auth = MemoBaseAuth()
+
+    request = make_mocked_request("GET", "/")
+    request.user = MagicMock()
+    request.user.get.return_value = ["user", "admin"]
+
+    first = await auth.get_permissions(request)
+    second = await auth.get_permissions(request)
+
+    assert first == frozenset(("user", "admin"))
+    assert second is first
+    request.user.get.assert_called_once_with("permissions")
+
+
+async def test_get_permissions_parses_again_if_user_changes():
+    auth = MemoBaseAuth()
+
+    request = make_mocked_request("GET", "/")
+    request.user = {"permissions": ["user"]}
+    await auth.get_permissions(request)
+
+    request.user = {"permissions": ["admin"]}
+    scopes = await auth.get_permissions(request)
+
+    assert scopes == frozenset(("admin",))
+
+
+async def test_get_permissions_handles_users_without_permissions():
+    auth = MemoBaseAuth()
+
+    request = make_mocked_request("GET", "/")
+    request.user = {}
+
+    assert await auth.get_permissions(request) is None
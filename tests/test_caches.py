@@ -0,0 +1,260 @@
+import asyncio
+import time
+from unittest.mock import patch
+
+from asynctest import CoroutineMock
+
+from aegis.caches import CredentialsCache, FailedTokenCache, TokenCache, UserCache
+
+
+async def test_token_cache_returns_stored_payload():
+    cache = TokenCache(maxsize=2)
+    key = cache.digest("token")
+
+    cache.set(key, {"user_id": 1})
+
+    assert cache.get(key) == {"user_id": 1}
+    assert cache.hits == 1
+    assert cache.misses == 0
+
+
+async def test_token_cache_counts_misses():
+    cache = TokenCache(maxsize=2)
+
+    assert cache.get(cache.digest("unknown")) is None
+    assert cache.misses == 1
+
+
+async def test_token_cache_evicts_expired_payloads():
+    cache = TokenCache(maxsize=2)
+    key = cache.digest("token")
+
+    cache.set(key, {"user_id": 1, "exp": time.time() - 1})
+
+    assert cache.get(key) is None
+    assert len(cache) == 0
+
+
+async def test_token_cache_evicts_least_recently_used_when_full():
+    cache = TokenCache(maxsize=2)
+    first, second, third = (cache.digest(t) for t in ("first", "second", "third"))
+
+    cache.set(first, {"id": 1})
+    cache.set(second, {"id": 2})
+    # touch the first entry so the second becomes the oldest
+    cache.get(first)
+    cache.set(third, {"id": 3})
+
+    assert cache.get(second) is None
+    assert cache.get(first) == {"id": 1}
+    assert cache.get(third) == {"id": 3}
+
+
+async def test_token_cache_returns_copies():
+    cache = TokenCache()
+    key = cache.digest("token")
+    cache.set(key, {"id": 1})
+
+    cache.get(key)["id"] = 2
+
+    assert cache.get(key) == {"id": 1}
+
+
+async def test_user_cache_loads_user_once():
+    cache = UserCache("sub")
+    loader = CoroutineMock(return_value={"id": 1})
+
+    assert await cache.get({"sub": 1}, loader) == {"id": 1}
+    assert await cache.get({"sub": 1, "exp": 5}, loader) == {"id": 1}
+
+    loader.assert_awaited_once_with({"sub": 1})
+    assert cache.hits == 1
+    assert cache.misses == 1
+
+
+async def test_user_cache_shares_concurrent_loads():
+    cache = UserCache("sub")
+    calls = []
+
+    async def loader(credentials):
+        calls.append(credentials)
+        await asyncio.sleep(0)
+        return {"id": credentials["sub"]}
+
+    users = await asyncio.gather(*(cache.get({"sub": 1}, loader) for _ in range(5)))
+
+    assert users == [{"id": 1}] * 5
+    assert len(calls) == 1
+
+
+async def test_user_cache_expires_users():
+    cache = UserCache("sub", ttl=10)
+    loader = CoroutineMock(return_value={"id": 1})
+
+    with patch("aegis.caches.time.monotonic", return_value=100):
+        await cache.get({"sub": 1}, loader)
+    with patch("aegis.caches.time.monotonic", return_value=111):
+        await cache.get({"sub": 1}, loader)
+
+    assert loader.await_count == 2
+
+
+async def test_user_cache_evicts_least_recently_used_user():
+    cache = UserCache("sub", maxsize=1)
+    loader = CoroutineMock(side_effect=lambda credentials: {"id": credentials["sub"]})
+
+    await cache.get({"sub": 1}, loader)
+    await cache.get({"sub": 2}, loader)
+
+    assert len(cache) == 1
+    await cache.get({"sub": 1}, loader)
+    assert loader.await_count == 3
+
+
+async def test_user_cache_invalidates_users():
+    cache = UserCache("sub")
+    loader = CoroutineMock(return_value={"id": 1})
+
+    await cache.get({"sub": 1}, loader)
+    cache.invalidate(1)
+    await cache.get({"sub": 1}, loader)
+
+    assert loader.await_count == 2
+
+
+async def test_user_cache_does_not_store_invalidated_loads():
+    cache = UserCache("sub")
+
+    async def loader(credentials):
+        cache.invalidate(credentials["sub"])
+        return {"id": 1}
+
+    await cache.get({"sub": 1}, loader)
+
+    assert len(cache) == 0
+
+
+async def test_user_cache_does_not_store_failures():
+    cache = UserCache("sub")
+    loader = CoroutineMock(side_effect=[ValueError(), {"id": 1}, None])
+
+    try:
+        await cache.get({"sub": 1}, loader)
+    except ValueError:
+        pass
+    assert len(cache) == 0
+
+    assert await cache.get({"sub": 1}, loader) == {"id": 1}
+    assert len(cache) == 1
+
+
+async def test_user_cache_bypasses_credentials_without_key():
+    cache = UserCache("sub")
+    loader = CoroutineMock(return_value={"id": 1})
+
+    await cache.get({"user_id": 1}, loader)
+    await cache.get({"user_id": 1}, loader)
+
+    assert loader.await_count == 2
+    assert len(cache) == 0
+
+
+async def test_user_cache_returns_copies():
+    cache = UserCache("sub")
+    loader = CoroutineMock(return_value={"id": 1})
+
+    (await cache.get({"sub": 1}, loader))["id"] = 2
+
+    assert await cache.get({"sub": 1}, loader) == {"id": 1}
+
+
+async def test_credentials_cache_returns_verified_user_without_excluded_fields():
+    cache = CredentialsCache("user_id", exclude=("password",))
+    user = cache.set(
+        "Basic token", {"user_id": 1}, {"user_id": 1, "password": "secret"}
+    )
+
+    assert user == {"user_id": 1}
+    assert cache.get("Basic token") == {"user_id": 1}
+    assert cache.get("Basic other") is None
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+async def test_credentials_cache_does_not_retain_the_header():
+    cache = CredentialsCache("user_id")
+    cache.set("Basic token", {"user_id": 1}, {"user_id": 1})
+
+    (lookup, (digest, key, user, _)), = cache._entries.items()
+    assert b"token" not in digest
+    assert lookup == digest[:16]
+    assert key == 1
+
+
+async def test_credentials_cache_compares_digests_in_constant_time():
+    cache = CredentialsCache("user_id")
+    cache.set("Basic token", {"user_id": 1}, {"user_id": 1})
+
+    with patch("aegis.caches.hmac.compare_digest", return_value=False) as compare:
+        assert cache.get("Basic token") is None
+    compare.assert_called_once()
+
+
+async def test_credentials_cache_expires_entries():
+    cache = CredentialsCache("user_id", ttl=10)
+    with patch("aegis.caches.time.monotonic", return_value=100):
+        cache.set("Basic token", {"user_id": 1}, {"user_id": 1})
+    with patch("aegis.caches.time.monotonic", return_value=111):
+        assert cache.get("Basic token") is None
+    assert len(cache) == 0
+
+
+async def test_credentials_cache_invalidates_every_header_of_a_user():
+    cache = CredentialsCache("user_id")
+    cache.set("Basic old", {"user_id": 1}, {"user_id": 1})
+    cache.set("Basic new", {"user_id": 1}, {"user_id": 1})
+    cache.set("Basic other", {"user_id": 2}, {"user_id": 2})
+
+    cache.invalidate(1)
+
+    assert cache.get("Basic old") is None
+    assert cache.get("Basic new") is None
+    assert cache.get("Basic other") == {"user_id": 2}
+
+
+async def test_credentials_cache_evicts_least_recently_used_header():
+    cache = CredentialsCache("user_id", maxsize=2)
+    cache.set("Basic a", {"user_id": 1}, {"user_id": 1})
+    cache.set("Basic b", {"user_id": 2}, {"user_id": 2})
+    cache.get("Basic a")
+    cache.set("Basic c", {"user_id": 3}, {"user_id": 3})
+
+    assert cache.get("Basic b") is None
+    assert cache.get("Basic a") == {"user_id": 1}
+    assert cache._lookups_by_key.keys() == {1, 3}
+
+
+async def test_failed_token_cache_returns_the_failure_until_it_expires():
+    cache = FailedTokenCache(maxsize=2)
+    key = TokenCache.digest("token")
+
+    cache.set(key, ValueError, ttl=30)
+
+    assert cache.get(key) is ValueError
+    with patch("aegis.caches.time.monotonic", return_value=time.monotonic() + 31):
+        assert cache.get(key) is None
+    assert len(cache) == 0
+
+
+async def test_failed_token_cache_evicts_only_its_own_entries():
+    token_cache = TokenCache(maxsize=1)
+    verified = token_cache.digest("verified")
+    token_cache.set(verified, {"user_id": 1})
+    cache = FailedTokenCache(maxsize=2)
+
+    for index in range(10):
+        cache.set(TokenCache.digest(f"forged {index}"), ValueError, ttl=30)
+
+    assert len(cache) == 2
+    assert cache.get(TokenCache.digest("forged 9")) is ValueError
+    assert cache.get(TokenCache.digest("forged 0")) is None
+    assert token_cache.get(verified) == {"user_id": 1}
@@ -0,0 +1,104 @@
+import base64
+
+import pytest
+from aiohttp import web
+from asynctest import CoroutineMock
+
+from aegis import (
+    AuthenticatorChain,
+    BasicAuth,
+    InvalidTokenException,
+    JWTAuth,
+    login_required,
+)
+
+
+class ChainedJWTAuth(JWTAuth):
+    jwt_secret = "secret"
+
+    async def authenticate(self, request):
+        return {"user_id": 1}
+
+
+class ChainedBasicAuth(BasicAuth):
+    async def authenticate(self, request):
+        return None
+
+    async def get_user(self, credentials):
+        return {"user_id": credentials["user_id"]}
+
+
+class SchemeChain(AuthenticatorChain):
+    authenticators = (ChainedJWTAuth, ChainedBasicAuth)
+
+
+async def make_client(aiohttp_client):
+    @login_required
+    async def view(request):
+        return web.json_response(request.user)
+
+    app = web.Application()
+    app.router.add_get("/", view)
+    SchemeChain.setup(app)
+    return await aiohttp_client(app)
+
+
+async def test_chain_dispatches_headers_by_their_scheme(aiohttp_client):
+    client = await make_client(aiohttp_client)
+
+    resp = await client.post("/auth")
+    token = (await resp.json())["access_token"]
+    resp = await client.get("/", headers={"Authorization": f"Bearer {token}"})
+    assert resp.status == 200
+    assert (await resp.json())["user_id"] == 1
+
+    credentials = base64.b64encode(b"user:password").decode()
+    resp = await client.get("/", headers={"Authorization": f"basic {credentials}"})
+    assert resp.status == 200
+    assert await resp.json() == {"user_id": "user"}
+
+    resp = await client.get("/me", headers={"Authorization": f"Basic {credentials}"})
+    assert resp.status == 200
+
+
+async def test_chain_rejects_unregistered_schemes_without_decoding(aiohttp_client):
+    client = await make_client(aiohttp_client)
+    chain = client.server.app["authenticator"]
+    decoders = [
+        CoroutineMock(side_effect=member.decode) for member in chain.schemes.values()
+    ]
+    for member, decoder in zip(chain.schemes.values(), decoders):
+        member.decode = decoder
+
+    for header in ("Digest realm", "token-without-scheme"):
+        resp = await client.get("/", headers={"Authorization": header})
+        assert resp.status == 401
+        assert (await resp.json())["title"] == "Invalid Token"
+
+    assert all(decoder.await_count == 0 for decoder in decoders)
+
+
+async def test_chain_requires_a_scheme_per_authenticator():
+    class DuplicateChain(AuthenticatorChain):
+        authenticators = (ChainedJWTAuth, ChainedJWTAuth)
+
+    with pytest.raises(ValueError):
+        DuplicateChain()
+
+
+async def test_authenticators_reject_headers_of_another_scheme():
+    authenticator = ChainedJWTAuth()
+    token = await authenticator.encode({"user_id": 1})
+
+    assert (await authenticator.decode(f"bearer {token}"))["user_id"] == 1
+    assert (await authenticator.decode(token))["user_id"] == 1
+    with pytest.raises(InvalidTokenException):
+        await authenticator.decode(f"Basic {token}")
+
+
+async def test_chain_rejects_the_user_cache():
+    class CachedChain(SchemeChain):
+        user_cache_key = "user_id"
+
+    with pytest.raises(ValueError):
+        CachedChain()
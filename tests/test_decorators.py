@@ -4,6 +4,7 @@ import pytest
 from aiohttp import web
 from aiohttp.test_utils import make_mocked_request
 from aegis import decorators
+from aegis.matching_algorithms import match_all
 from asynctest import CoroutineMock
 
 
@@ -128,3 +129,29 @@ async def test_permissions_awaits_view_on_happy_path():
             provided_permissions, required_permissions, "any"
         )
         assert forbidden.not_awaited
+
+
+async def test_permissions_rejects_invalid_algorithm_on_decoration():
+    with pytest.raises(TypeError):
+        decorators.permissions("test_permission", algorithm="invalid")
+
+
+async def test_permissions_passes_precompiled_requirements():
+    required_permissions = ("test_permission", "other_permission")
+    provided_permissions = ("test_permission",)
+
+    @decorators.permissions(*required_permissions, algorithm="all")
+    async def test_view(request):
+        return web.json_response({})
+
+    stub_request = make_mocked_request("GET", "/", headers={"authorization": "x"})
+    authenticator = CoroutineMock()
+    stub_request.app["authenticator"] = authenticator
+    authenticator.get_permissions = CoroutineMock(return_value=provided_permissions)
+    authenticator.check_permissions = CoroutineMock(return_value=True)
+
+    await test_view(stub_request)
+
+    authenticator.check_permissions.assert_awaited_once_with(
+        provided_permissions, frozenset(required_permissions), algorithm=match_all
+    )
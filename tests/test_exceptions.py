@@ -1,3 +1,4 @@
+import json
 from unittest.mock import MagicMock, patch
 
 from aiohttp.test_utils import make_mocked_request
@@ -10,25 +11,66 @@ from aegis.exceptions import (
 
 async def test_make_response_uses_get_schema():
     with patch("aegis.exceptions.AuthException.get_schema") as get_schema:
-        with patch("aegis.exceptions.AuthException._format_schema") as _format_schema:
-            with patch("aegis.exceptions.web"):
+        get_schema.return_value = {"test": True, "instance": "{url}"}
+
+        request = make_mocked_request("GET", "/")
+
+        class CustomException(AuthException):
+            status = 501
+
+        response = CustomException.make_response(request)
+
+        assert get_schema.called
+        assert response.status == 501
+        assert json.loads(response.body) == {"test": True, "instance": str(request.url)}
+
+
+async def test_make_response_compiles_schema_once():
+    with patch("aegis.exceptions.AuthException.get_schema") as get_schema:
+        get_schema.return_value = {
+            "detail": "No access for {url}",
+            "instance": "{url}",
+            "status": "{status}",
+        }
+
+        class CustomException(AuthException):
+            status = 403
+
+        first_request = make_mocked_request("GET", "/first")
+        second_request = make_mocked_request("GET", '/"q"')
+        first = CustomException.make_response(first_request)
+        second = CustomException.make_response(second_request)
+
+        get_schema.assert_called_once()
+        assert json.loads(first.body) == {
+            "detail": f"No access for {first_request.url}",
+            "instance": str(first_request.url),
+            "status": "403",
+        }
+        assert json.loads(second.body)["instance"] == str(second_request.url)
+        assert str(second_request.url).endswith("/%22q%22")
+        assert first.content_type == "application/json"
+        assert first.charset == "utf-8"
+
+
+async def test_make_response_escapes_url():
+    request = make_mocked_request("GET", "/")
 
-                get_schema.return_value = {"test": True}
+    class CustomException(AuthException):
+        status = 400
 
-                request = make_mocked_request("GET", "/")
+        @staticmethod
+        def get_schema():
+            return {"instance": "{url}"}
 
-                class CustomException(AuthException):
-                    status = 501
+    with patch.object(type(request), "url", "http://example.com/\\\"x"):
+        response = CustomException.make_response(request)
 
-                CustomException.make_response(request)
-                assert get_schema.called
-                _format_schema.assert_called_with(
-                    {"test": True}, url=request.url, status=501
-                )
+    assert json.loads(response.body) == {"instance": "http://example.com/\\\"x"}
 
 
 async def test_make_response_formats_with_kwargs():
-    with patch("aegis.exceptions.web"):
+    with patch("aegis.exceptions.json_response"):
         with patch("aegis.exceptions.AuthException._format_schema") as _format_schema:
 
             request = make_mocked_request("GET", "/")
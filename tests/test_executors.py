@@ -0,0 +1,142 @@
+import asyncio
+import time
+from unittest.mock import patch
+
+import jwt
+import pytest
+
+from aegis.authenticators.jwt import JWTAuth
+from aegis.exceptions import InvalidTokenException, ServiceUnavailableException
+from aegis.executors import BatchExecutor, _run_batch
+
+
+async def test_batch_executor_rejects_invalid_mode():
+    with pytest.raises(ValueError):
+        BatchExecutor("inline")
+
+
+async def test_batch_executor_returns_results():
+    executor = BatchExecutor("thread", max_workers=1)
+
+    assert await executor.run(divmod, 7, 2) == (3, 1)
+    executor.shutdown()
+
+
+async def test_batch_executor_raises_call_exceptions():
+    executor = BatchExecutor("thread", max_workers=1)
+
+    with pytest.raises(ZeroDivisionError):
+        await executor.run(divmod, 1, 0)
+    executor.shutdown()
+
+
+async def test_batch_executor_batches_concurrent_calls():
+    executor = BatchExecutor("thread", max_workers=1)
+
+    with patch("aegis.executors._run_batch", side_effect=_run_batch) as run_batch:
+        results = await asyncio.gather(*(executor.run(abs, -i) for i in range(5)))
+
+    assert results == [0, 1, 2, 3, 4]
+    run_batch.assert_called_once()
+    executor.shutdown()
+
+
+async def test_batch_executor_limits_batch_size():
+    executor = BatchExecutor("thread", max_workers=1, max_batch_size=2)
+
+    with patch("aegis.executors._run_batch", side_effect=_run_batch) as run_batch:
+        results = await asyncio.gather(*(executor.run(abs, -i) for i in range(5)))
+
+    assert results == [0, 1, 2, 3, 4]
+    assert run_batch.call_count == 3
+    executor.shutdown()
+
+
+async def test_batch_executor_splits_batches_across_workers():
+    executor = BatchExecutor("thread", max_workers=2)
+
+    with patch("aegis.executors._run_batch", side_effect=_run_batch) as run_batch:
+        results = await asyncio.gather(*(executor.run(abs, -i) for i in range(5)))
+
+    assert results == [0, 1, 2, 3, 4]
+    assert [len(call.args[0]) for call in run_batch.call_args_list] == [3, 2]
+    executor.shutdown()
+
+
+async def test_batch_executor_runs_concurrent_calls_in_parallel():
+    executor = BatchExecutor("thread", max_workers=4)
+    await executor.run(abs, 0)  # start the pool
+
+    started = time.perf_counter()
+    await asyncio.gather(*(executor.run(time.sleep, 0.1) for _ in range(4)))
+
+    assert time.perf_counter() - started < 0.3
+    executor.shutdown()
+
+
+async def test_batch_executor_runs_in_process_pool():
+    executor = BatchExecutor("process", max_workers=1)
+
+    assert await executor.run(divmod, 7, 2) == (3, 1)
+    executor.shutdown()
+
+
+class OffloadedJWTAuth(JWTAuth):
+    jwt_secret = "secret"
+    execution_mode = "thread"
+    inline_algorithms = frozenset()
+
+    async def authenticate(self, request):
+        pass
+
+
+async def test_jwt_auth_offloads_token_verification():
+    auth = OffloadedJWTAuth()
+
+    with patch.object(auth.executor, "run", wraps=auth.executor.run) as run:
+        token = await auth.encode({"user_id": 1})
+        payload = await auth.decode(f"Bearer {token}")
+
+    assert payload["user_id"] == 1
+    assert run.call_count == 2
+    auth.executor.shutdown()
+
+
+async def test_jwt_auth_maps_offloaded_errors():
+    auth = OffloadedJWTAuth()
+
+    with pytest.raises(InvalidTokenException):
+        await auth.decode("Bearer invalid")
+    auth.executor.shutdown()
+
+
+async def test_jwt_auth_keeps_inline_algorithms_on_loop():
+    class InlineHS256JWTAuth(OffloadedJWTAuth):
+        inline_algorithms = frozenset(("HS256",))
+
+    auth = InlineHS256JWTAuth()
+    token = jwt.encode({"user_id": 1}, "secret", "HS256").decode()
+
+    with patch.object(auth.executor, "run") as run:
+        assert await auth.decode(token) == {"user_id": 1}
+
+    run.assert_not_called()
+
+
+async def test_jwt_auth_runs_inline_by_default():
+    class TestJWTAuth(JWTAuth):
+        jwt_secret = "secret"
+
+        async def authenticate(self, request):
+            pass
+
+    assert TestJWTAuth().executor is None
+
+
+async def test_jwt_auth_maps_executor_failures_to_service_unavailable():
+    auth = OffloadedJWTAuth()
+    token = jwt.encode({"user_id": 1}, "secret", "HS256").decode()
+
+    with patch.object(auth.executor, "run", side_effect=RuntimeError("broken pool")):
+        with pytest.raises(ServiceUnavailableException):
+            await auth.decode(token)
@@ -0,0 +1,108 @@
+import asyncio
+import threading
+
+import pytest
+from asynctest import CoroutineMock
+
+from aegis.authenticators.basic import BasicAuth
+from aegis.exceptions import ServiceUnavailableException
+from aegis.hashers import PasswordHashingPool, PBKDF2Hasher, ScryptHasher
+
+
+@pytest.mark.parametrize(
+    "hasher", [PBKDF2Hasher(iterations=1000), ScryptHasher(n=2 ** 8)]
+)
+async def test_hasher_verifies_its_hashes(hasher):
+    encoded = hasher.hash("secret")
+
+    assert encoded.startswith(hasher.algorithm + "$")
+    assert hasher.verify("secret", encoded)
+    assert not hasher.verify("wrong", encoded)
+    assert not hasher.verify("secret", "invalid")
+    assert not hasher.needs_rehash(encoded)
+
+
+async def test_hasher_needs_rehash_on_parameter_change():
+    encoded = PBKDF2Hasher(iterations=1000).hash("secret")
+
+    assert PBKDF2Hasher(iterations=2000).needs_rehash(encoded)
+    assert PBKDF2Hasher(iterations=2000).verify("secret", encoded)
+    assert ScryptHasher().needs_rehash(encoded)
+
+
+async def test_hashing_pool_rejects_invalid_mode():
+    with pytest.raises(ValueError):
+        PasswordHashingPool(PBKDF2Hasher(), "inline")
+
+
+async def test_hashing_pool_runs_hasher_in_workers():
+    pool = PasswordHashingPool(PBKDF2Hasher(iterations=1000), max_workers=1)
+
+    encoded = await pool.hash("secret")
+
+    assert await pool.verify("secret", encoded)
+    assert pool.pending == 0
+    pool.shutdown()
+
+
+async def test_hashing_pool_sheds_jobs_over_the_admission_limit():
+    release = threading.Event()
+
+    class BlockingHasher(PBKDF2Hasher):
+        def verify(self, password, encoded):
+            release.wait()
+            return True
+
+    pool = PasswordHashingPool(BlockingHasher(), max_workers=1, max_pending=2)
+    admitted = [asyncio.ensure_future(pool.verify("secret", "")) for _ in range(2)]
+    await asyncio.sleep(0)
+
+    with pytest.raises(ServiceUnavailableException):
+        await pool.verify("secret", "")
+
+    release.set()
+    assert await asyncio.gather(*admitted) == [True, True]
+    assert pool.pending == 0
+    pool.shutdown()
+
+
+class HashingBasicAuth(BasicAuth):
+    password_hasher = PBKDF2Hasher(iterations=2000)
+
+    async def authenticate(self, request):
+        pass
+
+
+async def test_verify_password_requires_a_hasher():
+    class NoHasherAuth(BasicAuth):
+        async def authenticate(self, request):
+            pass
+
+    with pytest.raises(NotImplementedError):
+        await NoHasherAuth().verify_password({"password": "secret"}, "")
+
+
+async def test_verify_password_rehashes_outdated_hashes():
+    authenticator = HashingBasicAuth()
+    authenticator.update_password_hash = CoroutineMock()
+    outdated = PBKDF2Hasher(iterations=1000).hash("secret")
+    credentials = {"user_id": "user", "password": "secret"}
+
+    assert await authenticator.verify_password(credentials, outdated)
+
+    user_id, encoded = authenticator.update_password_hash.await_args[0]
+    assert user_id == "user"
+    assert encoded.startswith("pbkdf2_sha256$2000$")
+    assert authenticator.password_hasher.verify("secret", encoded)
+    authenticator.hashing_pool.shutdown()
+
+
+async def test_verify_password_does_not_rehash_on_failure():
+    authenticator = HashingBasicAuth()
+    authenticator.update_password_hash = CoroutineMock()
+    outdated = PBKDF2Hasher(iterations=1000).hash("secret")
+    credentials = {"user_id": "user", "password": "wrong"}
+
+    assert not await authenticator.verify_password(credentials, outdated)
+    authenticator.update_password_hash.assert_not_awaited()
+    authenticator.hashing_pool.shutdown()
@@ -0,0 +1,135 @@
+import pytest
+from aiohttp import web
+
+from aegis import JWTAuth, permissions
+from aegis.exceptions import InvalidTokenException
+from aegis.instrumentation import (
+    OK,
+    Histogram,
+    HistogramCollector,
+    Instrument,
+    timed,
+)
+
+
+class RecordingInstrument(Instrument):
+    def __init__(self):
+        self.records = []
+
+    def record(self, stage, duration, outcome):
+        self.records.append((stage, outcome))
+
+
+class InstrumentedJWTAuth(JWTAuth):
+    jwt_secret = "secret"
+    auth_endpoint = None
+    me_endpoint = None
+
+    async def authenticate(self, request):
+        pass
+
+
+@permissions("admin")
+async def admin_view(request):
+    return web.json_response({})
+
+
+async def make_client(aiohttp_client, instrument):
+    app = web.Application()
+    app.router.add_get("/admin", admin_view)
+    InstrumentedJWTAuth.instrument = instrument
+    try:
+        InstrumentedJWTAuth.setup(app)
+    finally:
+        InstrumentedJWTAuth.instrument = None
+    return await aiohttp_client(app)
+
+
+async def test_histogram_counts_observations_into_buckets():
+    histogram = Histogram((0.1, 1.0))
+
+    histogram.observe(0.05)
+    histogram.observe(0.5)
+    histogram.observe(5)
+
+    assert histogram.counts == [1, 1, 1]
+    assert histogram.count == 3
+    assert histogram.quantile(0.5) == 1.0
+    assert histogram.quantile(0.99) == float("inf")
+
+
+async def test_histogram_collector_snapshots_by_stage_and_outcome():
+    collector = HistogramCollector(bounds=(0.1,))
+
+    collector.record("decode", 0.01, OK)
+    collector.record("decode", 0.2, "InvalidTokenException")
+
+    snapshot = collector.snapshot()
+
+    assert snapshot["decode"][OK]["count"] == 1
+    assert snapshot["decode"][OK]["buckets"] == {"0.1": 1, "+Inf": 0}
+    assert snapshot["decode"]["InvalidTokenException"]["buckets"] == {
+        "0.1": 0,
+        "+Inf": 1,
+    }
+
+    collector.reset()
+    assert collector.snapshot() == {}
+
+
+async def test_timed_records_outcome():
+    instrument = RecordingInstrument()
+
+    async def succeed():
+        return 1
+
+    async def fail():
+        raise InvalidTokenException()
+
+    assert await timed(instrument, "decode", succeed()) == 1
+    with pytest.raises(InvalidTokenException):
+        await timed(instrument, "decode", fail())
+
+    assert instrument.records == [
+        ("decode", OK),
+        ("decode", "InvalidTokenException"),
+    ]
+
+
+async def test_middleware_records_stages(aiohttp_client):
+    instrument = RecordingInstrument()
+    client = await make_client(aiohttp_client, instrument)
+    authenticator = client.server.app["authenticator"]
+    token = await authenticator.encode({"permissions": ["user"]})
+
+    resp = await client.get("/admin", headers={"Authorization": f"Bearer {token}"})
+
+    assert resp.status == 403
+    assert instrument.records == [
+        ("decode", OK),
+        ("get_user", OK),
+        ("permissions", "ForbiddenException"),
+    ]
+
+
+async def test_middleware_records_error_responses(aiohttp_client):
+    instrument = RecordingInstrument()
+    client = await make_client(aiohttp_client, instrument)
+
+    resp = await client.get("/admin", headers={"Authorization": "Bearer invalid"})
+
+    assert resp.status == 401
+    assert instrument.records == [
+        ("decode", "InvalidTokenException"),
+        ("error_response", "InvalidTokenException"),
+    ]
+
+
+async def test_middleware_does_not_instrument_by_default(aiohttp_client):
+    client = await make_client(aiohttp_client, None)
+    authenticator = client.server.app["authenticator"]
+    token = await authenticator.encode({"permissions": ["admin"]})
+
+    resp = await client.get("/admin", headers={"Authorization": f"Bearer {token}"})
+
+    assert resp.status == 200
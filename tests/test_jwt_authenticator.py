@@ -110,3 +110,92 @@ async def test_get_user_returns_credentials_by_default():
     user = await auth.get_user(credentials)
 
     assert user == credentials
+
+
+async def test_decode_skips_signature_check_for_cached_tokens():
+    with patch("aegis.authenticators.jwt.jwt.decode") as decode:
+        decode.return_value = {"id": 1}
+
+        class TestJWTAuth(JWTAuth):
+            jwt_secret = ""
+            token_cache_size = 10
+
+            async def authenticate(self, request):
+                pass
+
+        auth = TestJWTAuth()
+
+        assert await auth.decode("Bearer test") == {"id": 1}
+        assert await auth.decode("Bearer test") == {"id": 1}
+
+        decode.assert_called_once()
+        assert auth.token_cache.hits == 1
+        assert auth.token_cache.misses == 1
+
+
+async def test_decode_bypasses_token_cache_without_verification():
+    with patch("aegis.authenticators.jwt.jwt.decode") as decode:
+        decode.return_value = {"id": 1}
+
+        class TestJWTAuth(JWTAuth):
+            jwt_secret = ""
+            token_cache_size = 10
+
+            async def authenticate(self, request):
+                pass
+
+        auth = TestJWTAuth()
+
+        await auth.decode("Bearer test", verify=False)
+        await auth.decode("Bearer test", verify=False)
+
+        assert decode.call_count == 2
+        assert len(auth.token_cache) == 0
+
+
+async def test_decode_rejects_recently_failed_tokens_without_decoding():
+    with patch("aegis.authenticators.jwt.jwt.decode") as decode:
+        decode.side_effect = jwt.InvalidSignatureError()
+
+        class TestJWTAuth(JWTAuth):
+            jwt_secret = ""
+            failed_token_cache_size = 10
+
+            async def authenticate(self, request):
+                pass
+
+        auth = TestJWTAuth()
+
+        for _ in range(3):
+            with pytest.raises(InvalidTokenException):
+                await auth.decode("Bearer forged")
+
+        decode.assert_called_once()
+        assert auth.failed_token_cache.hits == 2
+
+
+async def test_decode_caches_expired_tokens_only_for_verification():
+    with patch("aegis.authenticators.jwt.jwt.decode") as decode:
+        decode.side_effect = jwt.ExpiredSignatureError()
+
+        class TestJWTAuth(JWTAuth):
+            jwt_secret = ""
+            failed_token_cache_size = 10
+            expired_token_cache_ttl = 10
+
+            async def authenticate(self, request):
+                pass
+
+        auth = TestJWTAuth()
+
+        with pytest.raises(TokenExpiredException):
+            await auth.decode("Bearer expired")
+        with pytest.raises(TokenExpiredException):
+            await auth.decode("Bearer expired")
+        assert decode.call_count == 1
+
+        decode.side_effect = None
+        decode.return_value = {"id": 1}
+
+        # refresh routes decode expired tokens without verifying the expiration
+        assert await auth.decode("Bearer expired", verify=False) == {"id": 1}
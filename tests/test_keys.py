@@ -0,0 +1,211 @@
+import asyncio
+import base64
+import json
+
+import jwt
+import pytest
+from aiohttp import web
+
+from aegis.authenticators.jwt import JWTAuth
+from aegis.exceptions import InvalidTokenException
+from aegis.keys import KeySet, parse_jwk
+
+rsa = pytest.importorskip("cryptography.hazmat.primitives.asymmetric.rsa")
+ec = pytest.importorskip("cryptography.hazmat.primitives.asymmetric.ec")
+backends = pytest.importorskip("cryptography.hazmat.backends")
+serialization = pytest.importorskip("cryptography.hazmat.primitives.serialization")
+
+
+def make_rsa_key():
+    return rsa.generate_private_key(
+        public_exponent=65537, key_size=2048, backend=backends.default_backend()
+    )
+
+
+def make_jwk(kid, private_key, algorithm="RS256"):
+    public_jwk = json.loads(jwt.algorithms.RSAAlgorithm.to_jwk(private_key.public_key()))
+    return {**public_jwk, "kid": kid, "alg": algorithm}
+
+
+def make_authenticator(key_set):
+    class TestJWTAuth(JWTAuth):
+        jwt_keys = key_set
+
+        async def authenticate(self, request):
+            pass
+
+    return TestJWTAuth()
+
+
+async def test_parse_jwk_uses_key_algorithm():
+    private_key = make_rsa_key()
+
+    algorithm, key = parse_jwk(make_jwk("k1", private_key, algorithm="RS512"))
+
+    assert algorithm == "RS512"
+    assert key.public_numbers() == private_key.public_key().public_numbers()
+
+
+async def test_parse_jwk_rejects_unsupported_algorithm():
+    with pytest.raises(ValueError):
+        parse_jwk({"kty": "RSA", "alg": "unknown"})
+
+
+async def test_decode_selects_key_by_kid():
+    first_key, second_key = make_rsa_key(), make_rsa_key()
+    key_set = KeySet.from_jwks(
+        {"keys": [make_jwk("first", first_key), make_jwk("second", second_key)]}
+    )
+    auth = make_authenticator(key_set)
+    token = jwt.encode(
+        {"user_id": 1}, second_key, "RS256", headers={"kid": "second"}
+    ).decode()
+
+    payload = await auth.decode(f"Bearer {token}")
+
+    assert payload == {"user_id": 1}
+
+
+async def test_decode_rejects_unknown_kid():
+    private_key = make_rsa_key()
+    auth = make_authenticator(KeySet.from_jwks({"keys": [make_jwk("k1", private_key)]}))
+    token = jwt.encode({"user_id": 1}, private_key, "RS256", headers={"kid": "k2"})
+
+    with pytest.raises(InvalidTokenException):
+        await auth.decode(token.decode())
+
+
+async def test_decode_rejects_algorithm_mismatch():
+    private_key = make_rsa_key()
+    auth = make_authenticator(KeySet.from_jwks({"keys": [make_jwk("k1", private_key)]}))
+    token = jwt.encode({"user_id": 1}, "secret", "HS256", headers={"kid": "k1"})
+
+    with pytest.raises(InvalidTokenException):
+        await auth.decode(token.decode())
+
+
+async def test_decode_verifies_ec_keys_added_as_pem():
+    private_key = ec.generate_private_key(ec.SECP256R1(), backends.default_backend())
+    public_pem = private_key.public_key().public_bytes(
+        serialization.Encoding.PEM, serialization.PublicFormat.SubjectPublicKeyInfo
+    )
+    key_set = KeySet()
+    key_set.add_key("ec", "ES256", public_pem)
+    auth = make_authenticator(key_set)
+    token = jwt.encode({"user_id": 1}, private_key, "ES256", headers={"kid": "ec"})
+
+    assert await auth.decode(token.decode()) == {"user_id": 1}
+
+
+async def test_key_set_reloads_on_unknown_kid():
+    rotated_key = make_rsa_key()
+    calls = []
+
+    async def provider():
+        calls.append(1)
+        return {"keys": [make_jwk("rotated", rotated_key)]}
+
+    key_set = KeySet(provider=provider, refresh_interval=60)
+
+    assert await key_set.get_key("rotated") is not None
+    # refreshes are rate limited
+    assert await key_set.get_key("unknown") is None
+    assert len(calls) == 1
+
+
+async def test_decode_rejects_unknown_kid_when_the_provider_fails():
+    private_key = make_rsa_key()
+
+    def provider():
+        raise ConnectionError("JWKS endpoint is down")
+
+    key_set = KeySet.from_jwks(
+        {"keys": [make_jwk("k1", private_key)]}, provider=provider
+    )
+    auth = make_authenticator(key_set)
+    token = jwt.encode({"user_id": 1}, private_key, "RS256", headers={"kid": "k2"})
+
+    with pytest.raises(InvalidTokenException):
+        await auth.decode(token.decode())
+    # the current keys are kept
+    assert "k1" in key_set
+
+
+async def test_key_set_shares_concurrent_refreshes():
+    private_key = make_rsa_key()
+    calls = []
+
+    async def provider():
+        calls.append(1)
+        await asyncio.sleep(0)
+        return {"keys": [make_jwk("k1", private_key)]}
+
+    key_set = KeySet(provider=provider)
+
+    await asyncio.gather(key_set.refresh(), key_set.refresh())
+
+    assert len(calls) == 1
+    assert "k1" in key_set
+
+
+async def test_key_set_swaps_keys_on_load():
+    first_key, second_key = make_rsa_key(), make_rsa_key()
+    key_set = KeySet.from_jwks({"keys": [make_jwk("first", first_key)]})
+    entry = key_set.get("first")
+
+    key_set.load_jwks({"keys": [make_jwk("second", second_key)]})
+
+    assert "first" not in key_set
+    assert "second" in key_set
+    # keys looked up before the rotation stay usable
+    assert entry[1].public_numbers() == first_key.public_key().public_numbers()
+
+
+async def test_setup_loads_keys_from_provider_on_startup():
+    private_key = make_rsa_key()
+    key_set = KeySet(provider=lambda: {"keys": [make_jwk("k1", private_key)]})
+    app = web.Application()
+
+    class TestJWTAuth(JWTAuth):
+        jwt_keys = key_set
+
+        async def authenticate(self, request):
+            pass
+
+    TestJWTAuth.setup(app)
+    app.freeze()
+    await app.startup()
+
+    assert "k1" in key_set
+
+
+async def test_decode_verifies_parsed_keys_in_process_workers():
+    private_key = make_rsa_key()
+
+    class ProcessJWTAuth(JWTAuth):
+        jwt_keys = KeySet.from_jwks({"keys": [make_jwk("k1", private_key)]})
+        execution_mode = "process"
+        executor_workers = 1
+
+        async def authenticate(self, request):
+            pass
+
+    auth = ProcessJWTAuth()
+    token = jwt.encode({"user_id": 1}, private_key, "RS256", headers={"kid": "k1"})
+
+    try:
+        assert await auth.decode(token.decode()) == {"user_id": 1}
+        with pytest.raises(InvalidTokenException):
+            await auth.decode(token.decode()[:-4] + "AAAA")
+    finally:
+        auth.executor.shutdown()
+
+
+async def test_decode_rejects_tokens_with_malformed_kid():
+    auth = make_authenticator(KeySet.from_jwks({"keys": []}))
+    header = base64.urlsafe_b64encode(b'{"alg":"HS256","kid":["x"]}').rstrip(b"=")
+    token = jwt.encode({"user_id": 1}, "secret", "HS256").decode()
+    forged = ".".join([header.decode(), *token.split(".")[1:]])
+
+    with pytest.raises(InvalidTokenException):
+        await auth.decode(forged)
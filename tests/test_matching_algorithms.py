@@ -1,4 +1,12 @@
-from aegis.matching_algorithms import match_all, match_any, match_exact
+import pytest
+
+from aegis.matching_algorithms import (
+    match_all,
+    match_any,
+    match_exact,
+    match_hierarchical,
+    resolve_algorithm,
+)
 
 
 async def test_match_any_matches_subset():
@@ -167,3 +175,90 @@ async def test_match_all_not_matches_different_sets():
         required=required_permissions, provided=provided_permissions
     )
     assert not has_permission
+
+
+async def test_matchers_accept_precompiled_scopes():
+    required_permissions = frozenset(("regular_user", "super_user"))
+
+    provided_permissions = frozenset(("regular_user",))
+
+    assert match_any(required=required_permissions, provided=provided_permissions)
+    assert not match_all(required=required_permissions, provided=provided_permissions)
+    assert not match_exact(
+        required=required_permissions, provided=provided_permissions
+    )
+
+
+async def test_resolve_algorithm_returns_builtin_matchers():
+    assert resolve_algorithm("any") is match_any
+    assert resolve_algorithm("all") is match_all
+    assert resolve_algorithm("exact") is match_exact
+    assert resolve_algorithm("hierarchical") is match_hierarchical
+
+
+async def test_resolve_algorithm_returns_custom_callables():
+    def custom_algorithm(required, provided):
+        return True
+
+    assert resolve_algorithm(custom_algorithm) is custom_algorithm
+
+
+async def test_resolve_algorithm_handles_invalid_algorithm():
+    with pytest.raises(TypeError) as te:
+        resolve_algorithm("invalid")
+
+    assert str(te.value) == (
+        "Invalid algorithm type. "
+        "Options 'all', 'any', 'exact', 'hierarchical', callable"
+    )
+
+
+async def test_match_hierarchical_matches_exact_scope():
+    required_permissions = frozenset(("orders:read",))
+
+    provided_permissions = ("users:read", "orders:read")
+
+    assert match_hierarchical(required_permissions, provided_permissions)
+
+
+async def test_match_hierarchical_matches_provided_wildcard():
+    required_permissions = frozenset(("orders:read", "orders:items:write"))
+
+    assert match_hierarchical(required_permissions, ("orders:*",))
+    assert match_hierarchical(required_permissions, ("*",))
+    assert not match_hierarchical(required_permissions, ("users:*",))
+
+
+async def test_match_hierarchical_matches_required_wildcard():
+    required_permissions = frozenset(("admin:*",))
+
+    assert match_hierarchical(required_permissions, ("admin:users:delete",))
+    assert not match_hierarchical(required_permissions, ("orders:read",))
+
+
+async def test_match_hierarchical_does_not_grant_parent_scopes():
+    required_permissions = frozenset(("orders",))
+
+    assert not match_hierarchical(required_permissions, ("orders:read",))
+    assert not match_hierarchical(frozenset(("orders:read",)), ("orders",))
+    assert not match_hierarchical(required_permissions, ())
+
+
+async def test_match_hierarchical_does_not_grant_the_prefix_of_a_wildcard():
+    assert not match_hierarchical(frozenset(("orders",)), ("orders:*",))
+    assert not match_hierarchical(frozenset(("admin:*",)), ("admin",))
+    assert match_hierarchical(frozenset(("orders:*",)), ("orders:*",))
+
+
+async def test_match_hierarchical_matches_middle_wildcards_segment_by_segment():
+    required_permissions = frozenset(("orders:*:read",))
+
+    assert match_hierarchical(required_permissions, ("orders:items:read",))
+    assert not match_hierarchical(required_permissions, ("orders:items:write",))
+    assert not match_hierarchical(required_permissions, ("orders:items",))
+    assert match_hierarchical(frozenset(("orders:items:read",)), ("orders:*:read",))
+    assert not match_hierarchical(frozenset(("orders:items:write",)), ("orders:*:read",))
+
+
+async def test_match_hierarchical_accepts_unhashable_requirements():
+    assert match_hierarchical(["orders:read"], ["orders:*"])
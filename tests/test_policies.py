@@ -0,0 +1,117 @@
+import pytest
+from aiohttp import web
+from asynctest import CoroutineMock
+
+from aegis import JWTAuth
+from aegis.policies import LOGIN, PUBLIC, PolicyTable, compile_policy, scopes
+
+
+class PolicyJWTAuth(JWTAuth):
+    jwt_secret = "secret"
+    policies = {
+        "/health": PUBLIC,
+        "/profile": LOGIN,
+        "admin": scopes("admin", "staff", algorithm="all"),
+    }
+
+    async def authenticate(self, request):
+        pass
+
+
+async def view(request):
+    return web.json_response({"user": getattr(request, "user", None)})
+
+
+async def make_client(aiohttp_client, upload=None):
+    app = web.Application()
+    app.router.add_get("/health", view)
+    PolicyJWTAuth.setup(app)
+    app.router.add_get("/profile", view)
+    app.router.add_post("/admin/{id}", upload or view, name="admin")
+    app.router.add_get("/other", view)
+    return await aiohttp_client(app)
+
+
+async def test_compile_policy_accepts_names_and_policies():
+    policy = scopes("admin")
+
+    assert compile_policy(policy) is policy
+    assert not compile_policy(PUBLIC).login
+    assert compile_policy(LOGIN).login
+    with pytest.raises(ValueError):
+        compile_policy("private")
+
+
+async def test_scopes_policy_requires_login():
+    policy = scopes("admin")
+
+    assert policy.login
+    assert policy.required == frozenset(("admin",))
+
+
+async def test_policy_table_resolves_routes_by_name_and_pattern():
+    app = web.Application()
+    health = app.router.add_get("/health", view)
+    admin = app.router.add_get("/admin/{id}", view, name="admin")
+    other = app.router.add_get("/other", view)
+    table = PolicyTable(PolicyJWTAuth.policies)
+
+    table.bind(app.router)
+
+    assert table._resources[health.resource] is table.policies["/health"]
+    assert table._resources[admin.resource] is table.policies["admin"]
+    assert table._resources[other.resource] is None
+
+
+async def test_public_routes_skip_token_decoding(aiohttp_client):
+    client = await make_client(aiohttp_client)
+    authenticator = client.server.app["authenticator"]
+    authenticator.decode = CoroutineMock()
+
+    resp = await client.get("/health", headers={"Authorization": "Bearer invalid"})
+
+    assert resp.status == 200
+    assert await resp.json() == {"user": None}
+    authenticator.decode.assert_not_awaited()
+
+
+async def test_login_routes_reject_anonymous_requests(aiohttp_client):
+    client = await make_client(aiohttp_client)
+    authenticator = client.server.app["authenticator"]
+    token = await authenticator.encode({"user_id": 1})
+
+    resp = await client.get("/profile")
+    assert resp.status == 401
+
+    resp = await client.get("/profile", headers={"Authorization": f"Bearer {token}"})
+    assert resp.status == 200
+    assert (await resp.json())["user"]["user_id"] == 1
+
+
+async def test_scope_routes_reject_before_the_handler(aiohttp_client):
+    upload = CoroutineMock(return_value=web.json_response({}))
+    client = await make_client(aiohttp_client, upload)
+    authenticator = client.server.app["authenticator"]
+    user_token = await authenticator.encode({"permissions": ["admin"]})
+    admin_token = await authenticator.encode({"permissions": ["admin", "staff"]})
+
+    resp = await client.post(
+        "/admin/1", data=b"x" * 1024, headers={"Authorization": f"Bearer {user_token}"}
+    )
+    assert resp.status == 403
+    upload.assert_not_awaited()
+
+    resp = await client.post(
+        "/admin/1", headers={"Authorization": f"Bearer {admin_token}"}
+    )
+    assert resp.status == 200
+    upload.assert_awaited_once()
+
+
+async def test_routes_without_policy_are_left_to_the_handler(aiohttp_client):
+    client = await make_client(aiohttp_client)
+
+    resp = await client.get("/other")
+
+    assert resp.status == 200
+    assert await resp.json() == {"user": None}
@@ -0,0 +1,129 @@
+import time
+from unittest.mock import patch
+
+import pytest
+from aiohttp import web
+
+from aegis import JWTAuth
+from aegis.exceptions import InvalidRefreshTokenException
+from aegis.refresh_tokens import InMemoryRefreshTokenStore, SQLiteRefreshTokenStore
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+async def store(request, tmp_path, loop):
+    if request.param == "memory":
+        yield InMemoryRefreshTokenStore()
+    else:
+        store = SQLiteRefreshTokenStore(str(tmp_path / "tokens.db"))
+        yield store
+        await store.close()
+
+
+async def test_store_rotates_tokens(store):
+    token = await store.issue("1", ttl=60)
+
+    rotated = await store.rotate(token, "1", ttl=60)
+
+    assert rotated != token
+    assert await store.rotate(rotated, "1", ttl=60)
+
+
+async def test_store_rejects_unknown_expired_and_foreign_tokens(store):
+    token = await store.issue("1", ttl=60)
+    expired = await store.issue("1", ttl=-1)
+
+    for args in (("unknown", "1"), (expired, "1"), (token, "2")):
+        with pytest.raises(InvalidRefreshTokenException):
+            await store.rotate(*args, ttl=60)
+    assert await store.rotate(token, "1", ttl=60)
+
+
+async def test_store_revokes_the_family_on_reuse(store):
+    token = await store.issue("1", ttl=60)
+    other_family = await store.issue("1", ttl=60)
+    rotated = await store.rotate(token, "1", ttl=60)
+
+    with pytest.raises(InvalidRefreshTokenException):
+        await store.rotate(token, "1", ttl=60)
+    with pytest.raises(InvalidRefreshTokenException):
+        await store.rotate(rotated, "1", ttl=60)
+    assert await store.rotate(other_family, "1", ttl=60)
+
+
+async def test_store_revokes_every_token_of_a_subject(store):
+    tokens = [await store.issue("1", ttl=60) for _ in range(2)]
+    other = await store.issue("2", ttl=60)
+
+    await store.revoke_subject("1")
+
+    for token in tokens:
+        with pytest.raises(InvalidRefreshTokenException):
+            await store.rotate(token, "1", ttl=60)
+    assert await store.rotate(other, "2", ttl=60)
+
+
+async def test_store_prunes_expired_tokens(store):
+    await store.issue("1", ttl=-1)
+    token = await store.issue("1", ttl=60)
+
+    assert await store.prune() == 1
+    assert await store.rotate(token, "1", ttl=60)
+
+
+async def test_store_keeps_only_token_digests(store):
+    token = await store.issue("1", ttl=60)
+
+    if isinstance(store, InMemoryRefreshTokenStore):
+        assert list(store._tokens) == [store.digest(token)]
+    else:
+        digests = store.connection.execute(
+            "SELECT digest FROM aegis_refresh_tokens"
+        ).fetchall()
+        assert digests == [(store.digest(token),)]
+
+
+async def test_in_memory_store_prunes_while_issuing():
+    store = InMemoryRefreshTokenStore(prune_interval=10)
+    now = time.time()
+    await store.issue("1", ttl=5)
+
+    with patch("aegis.refresh_tokens.time.time", return_value=now + 20):
+        await store.issue("1", ttl=60)
+
+    assert len(store) == 1
+    assert list(store._subjects) == ["1"]
+
+
+class StoreJWTAuth(JWTAuth):
+    jwt_secret = "secret"
+    refresh_token = True
+    refresh_token_store = InMemoryRefreshTokenStore()
+
+    async def authenticate(self, request):
+        return {"user_id": 1}
+
+
+async def test_refresh_route_rotates_stored_tokens(aiohttp_client):
+    app = web.Application()
+    StoreJWTAuth.setup(app)
+    client = await aiohttp_client(app)
+
+    resp = await client.post("/auth")
+    tokens = await resp.json()
+    headers = {"Authorization": f"Bearer {tokens['access_token']}"}
+
+    resp = await client.post(
+        "/auth/refresh", json={"refresh_token": tokens["refresh_token"]}, headers=headers
+    )
+    assert resp.status == 200
+    refreshed = await resp.json()
+    assert refreshed["refresh_token"] != tokens["refresh_token"]
+
+    # the old token has been used already
+    resp = await client.post(
+        "/auth/refresh", json={"refresh_token": tokens["refresh_token"]}, headers=headers
+    )
+    assert resp.status == 400
+
+    resp = await client.post("/auth/refresh", data=b"invalid", headers=headers)
+    assert resp.status == 400
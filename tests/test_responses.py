@@ -1,4 +1,10 @@
+import json
+from unittest.mock import MagicMock
+
+from aiohttp import web
 from aiohttp.test_utils import make_mocked_request
+from aegis import JWTAuth
+from aegis.serializers import get_json_dumps, json_response
 from aegis.exceptions import (
     AuthException,
     AuthRequiredException,
@@ -49,3 +55,68 @@ async def test_custom_error_response():
     resp = TestException.make_response(stub_request)
 
     assert resp.status == 500
+
+
+async def test_json_response_uses_the_given_serializer():
+    def dumps(data):
+        return b'{"fast": true}'
+
+    resp = json_response({"fast": False}, dumps, status=201)
+
+    assert resp.status == 201
+    assert resp.body == b'{"fast": true}'
+    assert resp.content_type == "application/json"
+    assert resp.charset == "utf-8"
+
+
+async def test_json_response_passes_serialized_bytes_through():
+    dumps = MagicMock()
+
+    resp = json_response(b'{"cached": true}', dumps)
+
+    assert resp.body == b'{"cached": true}'
+    dumps.assert_not_called()
+
+
+async def test_get_json_dumps_reads_the_serializer_of_the_authenticator():
+    def dumps(data):
+        return json.dumps(data, separators=(",", ":"))
+
+    class FastJWTAuth(JWTAuth):
+        json_dumps = dumps
+
+        async def authenticate(self, request):
+            pass
+
+    assert get_json_dumps(FastJWTAuth()) is dumps
+    assert get_json_dumps(None) is json.dumps
+
+
+async def test_routes_and_errors_use_the_serializer_of_the_authenticator(
+    aiohttp_client,
+):
+    def dumps(data):
+        return json.dumps(data, separators=(",", ":"))
+
+    class CompactJWTAuth(JWTAuth):
+        jwt_secret = "secret"
+        json_dumps = dumps
+
+        async def authenticate(self, request):
+            return {"user_id": 1}
+
+    app = web.Application()
+    CompactJWTAuth.setup(app)
+    client = await aiohttp_client(app)
+
+    resp = await client.post("/auth")
+    body = await resp.text()
+    assert body.startswith('{"access_token":"')
+
+    token = json.loads(body)["access_token"]
+    resp = await client.get("/me", headers={"Authorization": f"Bearer {token}"})
+    assert (await resp.text()).startswith('{"user_id":1,')
+
+    stub_request = make_mocked_request("GET", "/", app=app)
+    resp = ForbiddenException.make_response(stub_request, detail="custom")
+    assert b'"detail":"custom"' in resp.body
@@ -0,0 +1,201 @@
+import asyncio
+import json
+import time
+from unittest.mock import patch
+
+import pytest
+from aiohttp import web
+from asynctest import CoroutineMock
+
+from aegis import JWTAuth
+from aegis.exceptions import TokenRevokedException
+from aegis.revocation import RevocationList, fingerprint
+
+
+async def test_revocation_list_revokes_token_ids_until_they_expire():
+    revocations = RevocationList()
+    revocations.revoke("a", time.time() + 60)
+
+    assert revocations.is_revoked({"jti": "a"})
+    assert not revocations.is_revoked({"jti": "b"})
+    assert not revocations.is_revoked({})
+
+
+async def test_revocation_list_merges_recent_revocations_into_sorted_arrays():
+    revocations = RevocationList(merge_threshold=2)
+    exp = time.time() + 60
+    for jti in ("a", "b", "c"):
+        revocations.revoke(jti, exp)
+
+    # merged revocations are looked up until the arrays are swapped
+    for jti in ("a", "b", "c"):
+        assert revocations.is_revoked({"jti": jti})
+    await revocations._merged
+
+    assert list(revocations._ids) == sorted(fingerprint(jti) for jti in "ab")
+    assert revocations._recent == {fingerprint("c"): exp}
+    for jti in ("a", "b", "c"):
+        assert revocations.is_revoked({"jti": jti})
+
+
+async def test_revocation_list_merges_in_slices_off_the_request_path():
+    revocations = RevocationList(merge_threshold=8)
+    exp = time.time() + 60
+    revocations.load({"tokens": {str(i): exp for i in range(8)}})
+
+    with patch("aegis.revocation.MERGE_SLICE_SIZE", 2):
+        for jti in "abcdefgh":
+            revocations.revoke(jti, exp)
+        merged = revocations._merged
+        assert list(revocations._ids) == sorted(fingerprint(str(i)) for i in range(8))
+
+        iterations = 0
+        while not merged.done():
+            iterations += 1
+            await asyncio.sleep(0)
+
+    assert iterations > 4
+    assert len(revocations._ids) == 16
+    assert list(revocations._ids) == sorted(revocations._ids)
+    assert revocations.is_revoked({"jti": "a"}) and revocations.is_revoked({"jti": "0"})
+
+
+async def test_revocation_list_purges_expired_tokens():
+    revocations = RevocationList(merge_threshold=1)
+    now = time.time()
+    revocations.revoke("expired", now + 10)
+    revocations.revoke("valid", now + 100)
+
+    revocations.purge(now + 50)
+
+    assert list(revocations._ids) == [fingerprint("valid")]
+    assert len(revocations) == 1
+
+
+async def test_revocation_list_purges_automatically():
+    revocations = RevocationList(purge_interval=10)
+    now = time.time()
+    revocations.revoke("a", now + 5)
+
+    with patch("aegis.revocation.time.time", return_value=now + 20):
+        revocations.is_revoked({})
+    await revocations._merged
+
+    assert len(revocations) == 0
+    assert not revocations.is_revoked({"jti": "a"})
+
+
+async def test_revocation_list_revokes_tokens_issued_before_user_watermark():
+    revocations = RevocationList(max_token_age=100)
+    revocations.revoke_user(1, before=1000.5)
+
+    assert revocations.is_revoked({"user_id": 1, "iat": 999})
+    assert revocations.is_revoked({"user_id": 1})
+    # whole second iat of another issuer, it may predate the watermark
+    assert revocations.is_revoked({"user_id": 1, "iat": 1000})
+    assert revocations.is_revoked({"user_id": 1, "iat": 1000.5})
+    assert not revocations.is_revoked({"user_id": 1, "iat": 1000.501})
+    assert not revocations.is_revoked({"user_id": 2, "iat": 999})
+
+    revocations.purge(1101)
+    assert not revocations.is_revoked({"user_id": 1, "iat": 999})
+
+
+async def test_revocation_list_purges_users_in_expiration_order():
+    revocations = RevocationList(max_token_age=100)
+    revocations.revoke_user(1, before=1000)
+    revocations.revoke_user(2, before=1010)
+    revocations.revoke_user(1, before=1020)
+
+    revocations.purge(1115)
+    assert list(revocations._users) == ["1"]
+
+
+async def test_revocation_list_loads_snapshots_from_files(tmp_path):
+    now = time.time()
+    path = tmp_path / "revocations.json"
+    path.write_text(
+        json.dumps(
+            {
+                "tokens": {"a": now + 60, "expired": now - 1},
+                "users": {"7": now},
+            }
+        )
+    )
+
+    revocations = RevocationList.from_file(str(path), max_token_age=60)
+
+    assert len(revocations) == 2
+    assert revocations.is_revoked({"jti": "a"})
+    assert revocations.is_revoked({"user_id": 7, "iat": now - 1})
+
+
+async def test_revocation_list_refreshes_from_provider_in_background():
+    provider = CoroutineMock(return_value={"tokens": {"a": time.time() + 60}})
+    revocations = RevocationList(provider=provider, refresh_interval=0)
+
+    assert not revocations.is_revoked({"jti": "a"})
+    await asyncio.sleep(0)
+
+    assert revocations.is_revoked({"jti": "a"})
+    provider.assert_awaited_once()
+
+
+class RevocationJWTAuth(JWTAuth):
+    jwt_secret = "secret"
+    token_cache_size = 8
+
+    async def authenticate(self, request):
+        pass
+
+
+async def test_decode_rejects_revoked_tokens():
+    authenticator = RevocationJWTAuth()
+    authenticator.revocation_list = RevocationList(max_token_age=60)
+    token = await authenticator.encode({"user_id": 1})
+    payload = await authenticator.decode(token)
+    assert payload["jti"] and payload["iat"]
+
+    authenticator.revocation_list.revoke(payload["jti"], payload["exp"])
+
+    # cached payloads are checked as well
+    with pytest.raises(TokenRevokedException):
+        await authenticator.decode(token)
+    with pytest.raises(TokenRevokedException):
+        await authenticator.decode(token, verify=False)
+
+
+async def test_decode_revokes_tokens_by_their_millisecond_issuing_time():
+    authenticator = RevocationJWTAuth()
+    authenticator.revocation_list = RevocationList(max_token_age=60)
+    watermark = int(time.time()) + 0.5
+
+    # issued earlier in the same second as the watermark
+    with patch("aegis.authenticators.jwt.time.time", return_value=watermark - 0.1):
+        before = await authenticator.encode({"user_id": 1})
+    authenticator.revocation_list.revoke_user(1, before=watermark)
+    # logging out everywhere and back in within the same second
+    with patch("aegis.authenticators.jwt.time.time", return_value=watermark + 0.01):
+        after = await authenticator.encode({"user_id": 1})
+
+    with pytest.raises(TokenRevokedException):
+        await authenticator.decode(before)
+    assert (await authenticator.decode(after))["user_id"] == 1
+
+
+async def test_setup_loads_revocations_on_startup():
+    provider = CoroutineMock(return_value={"users": {"1": time.time() + 1}})
+
+    class ProviderJWTAuth(RevocationJWTAuth):
+        revocation_list = RevocationList(provider=provider)
+
+    app = web.Application()
+    ProviderJWTAuth.setup(app)
+    app.freeze()
+    await app.startup()
+
+    authenticator = app["authenticator"]
+    assert authenticator.revocation_list.max_token_age == authenticator.duration
+    token = await authenticator.encode({"user_id": 1})
+    with pytest.raises(TokenRevokedException):
+        await authenticator.decode(token)
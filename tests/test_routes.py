@@ -1,4 +1,5 @@
 import json
+import time
 from unittest.mock import MagicMock
 
 from aiohttp import web
@@ -68,7 +69,7 @@ async def test_auth_route_returns_access_and_refresh_token():
 
 async def test_auth_route_handles_auth_exception():
     stub_request = make_mocked_request("GET", "/")
-    AuthException.make_response = CoroutineMock(return_value=web.json_response({}))
+    make_response = CoroutineMock(return_value=web.json_response({}))
 
     class TestException(AuthException):
         status = 400
@@ -82,9 +83,10 @@ async def test_auth_route_handles_auth_exception():
 
     auth_route = make_auth_route(authenticator)
 
-    await auth_route(stub_request)
+    with patch.object(AuthException, "make_response", make_response):
+        await auth_route(stub_request)
 
-    assert AuthException.make_response.called_once_with(stub_request)
+    assert make_response.called_once_with(stub_request)
 
 
 async def test_me_route_returns_user_information():
@@ -178,3 +180,74 @@ async def test_refresh_returns_bad_request_if_refresh_token_invalid():
             assert authenticator.validate_refresh_token.called
             assert not authenticator.encode.called
             irte.make_response.assert_called_once_with(stub_request)
+
+
+async def test_me_route_answers_matching_etags_with_not_modified():
+    stub_user = {"user_id": 1}
+    me_route = make_me_route()
+
+    stub_request = make_mocked_request("GET", "/")
+    stub_request.user = stub_user
+    user_response = await me_route(stub_request)
+    etag = user_response.headers["ETag"]
+
+    assert user_response.headers["Cache-Control"] == "private, no-cache"
+    assert user_response.headers["Vary"] == "Authorization"
+
+    stub_request = make_mocked_request("GET", "/", headers={"If-None-Match": etag})
+    stub_request.user = stub_user
+    not_modified = await me_route(stub_request)
+
+    assert not_modified.status == 304
+    assert not_modified.headers["ETag"] == etag
+
+    stub_request = make_mocked_request("GET", "/", headers={"If-None-Match": '"x"'})
+    stub_request.user = {"user_id": 2}
+    user_response = await me_route(stub_request)
+
+    assert user_response.status == 200
+    assert user_response.headers["ETag"] != etag
+
+
+async def test_me_route_caches_responses_per_token():
+    authenticator = MagicMock(me_cache_size=1)
+    me_route = make_me_route(authenticator)
+    headers = {"Authorization": "Bearer token"}
+
+    serialized = patch("aegis.routes.serialize", side_effect=lambda data, dumps: b"{}")
+    with serialized as serialize:
+        for _ in range(2):
+            stub_request = make_mocked_request("GET", "/", headers=headers)
+            stub_request.user = {"user_id": 1}
+            user_response = await me_route(stub_request)
+            assert user_response.body == b"{}"
+
+        serialize.assert_called_once()
+
+        stub_request = make_mocked_request("GET", "/", headers={"Authorization": "x"})
+        stub_request.user = {"user_id": 2}
+        await me_route(stub_request)
+
+        assert serialize.call_count == 2
+
+
+async def test_me_route_serializes_the_user_again_after_the_ttl():
+    authenticator = MagicMock(me_cache_size=1, me_cache_ttl=5)
+    me_route = make_me_route(authenticator)
+    headers = {"Authorization": "Bearer token"}
+    now = time.monotonic()
+
+    async def get_me(user, seconds):
+        stub_request = make_mocked_request("GET", "/", headers=headers)
+        stub_request.user = user
+        with patch("aegis.routes.time.monotonic", return_value=now + seconds):
+            return await me_route(stub_request)
+
+    first = await get_me({"user_id": 1, "name": "old"}, 0)
+    # served from the cache within the ttl, even if the user changed
+    cached = await get_me({"user_id": 1, "name": "new"}, 4)
+    assert cached.headers["ETag"] == first.headers["ETag"]
+
+    renamed = await get_me({"user_id": 1, "name": "new"}, 6)
+    assert renamed.headers["ETag"] != first.headers["ETag"]
+    assert json.loads(renamed.body)["name"] == "new"
@@ -0,0 +1,113 @@
+from unittest.mock import MagicMock
+
+from aegis.authenticators.base import BaseAuthenticator
+from aegis.matching_algorithms import match_all, match_any, match_exact
+from aegis.scopes import ScopeMask, ScopeRegistry
+
+
+async def test_registry_assigns_distinct_bits():
+    registry = ScopeRegistry(("user", "admin"))
+
+    assert registry.bit("user") == 1
+    assert registry.bit("admin") == 2
+    assert registry.bit("unknown") == 0
+    assert len(registry) == 2
+
+
+async def test_registry_registers_unknown_scopes_on_encode():
+    registry = ScopeRegistry()
+
+    mask = registry.encode(["user", "admin"])
+
+    assert len(registry) == 2
+    assert mask.bits == 3
+
+
+async def test_registry_memoizes_compiled_requirements():
+    registry = ScopeRegistry()
+    required = frozenset(("user", "admin"))
+
+    assert registry.compile(required) == registry.compile(required)
+    assert registry._compiled == {required: 3}
+
+
+async def test_registry_compiles_unhashable_requirements():
+    registry = ScopeRegistry()
+
+    assert registry.compile(["user"]) == 1
+    assert registry._compiled == {}
+
+
+async def test_scope_mask_behaves_like_collection():
+    registry = ScopeRegistry()
+    mask = registry.encode(("user", "editor"))
+
+    assert isinstance(mask, ScopeMask)
+    assert "user" in mask
+    assert "admin" not in mask
+    assert list(mask) == ["user", "editor"]
+    assert len(mask) == 2
+
+
+async def test_matchers_use_bitmask():
+    registry = ScopeRegistry()
+    provided_permissions = registry.encode(("regular_user", "editor"))
+
+    assert match_any(frozenset(("regular_user", "super_user")), provided_permissions)
+    assert not match_any(frozenset(("super_user",)), provided_permissions)
+    assert match_all(frozenset(("regular_user",)), provided_permissions)
+    assert not match_all(
+        frozenset(("regular_user", "super_user")), provided_permissions
+    )
+    assert match_exact(frozenset(("editor", "regular_user")), provided_permissions)
+    assert not match_exact(frozenset(("editor",)), provided_permissions)
+
+
+async def test_matchers_handle_scopes_registered_after_encoding():
+    registry = ScopeRegistry()
+    provided_permissions = registry.encode(("regular_user",))
+
+    assert not match_any(frozenset(("super_user",)), provided_permissions)
+    assert not match_all(
+        frozenset(("regular_user", "super_user")), provided_permissions
+    )
+
+
+async def test_get_permissions_encodes_scopes_with_registry():
+    class TestBaseAuth(BaseAuthenticator):
+        scope_registry = ScopeRegistry()
+
+        async def decode(self, token: str) -> dict:
+            pass
+
+        async def get_user(self, credentials) -> dict:
+            pass
+
+        async def authenticate(self, request):
+            pass
+
+    auth = TestBaseAuth()
+
+    mock_request = MagicMock()
+    mock_request.user = {"permissions": ("test",)}
+
+    scopes = await auth.get_permissions(mock_request)
+
+    assert isinstance(scopes, ScopeMask)
+    assert "test" in scopes
+
+
+async def test_custom_algorithms_receive_iterable_scopes():
+    registry = ScopeRegistry()
+    provided_permissions = registry.encode(("admin",))
+
+    def match_any_and_admin(required_permissions, user_permissions):
+        return "admin" in user_permissions or match_any(
+            required_permissions, user_permissions
+        )
+
+    has_permission = await BaseAuthenticator.check_permissions(
+        provided_permissions, frozenset(("user",)), algorithm=match_any_and_admin
+    )
+
+    assert has_permission
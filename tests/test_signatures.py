@@ -0,0 +1,145 @@
+import time
+
+from aiohttp import web
+
+from aegis import HMACAuth
+from aegis.signatures import ReplayCache, sign_request
+
+
+async def test_replay_cache_rejects_seen_nonces():
+    cache = ReplayCache(window=60, bucket_width=10)
+
+    assert cache.add("nonce", now=1000)
+    assert not cache.add("nonce", now=1030)
+    assert cache.add("other", now=1030)
+
+
+async def test_replay_cache_drops_expired_buckets():
+    cache = ReplayCache(window=60, bucket_width=10)
+    cache.add("first", now=1000)
+    cache.add("second", now=1015)
+
+    cache.add("third", now=1070)
+    assert len(cache) == 2
+
+    assert cache.add("first", now=1070)
+    assert not cache.add("second", now=1070)
+
+
+class ServiceAuth(HMACAuth):
+    hmac_keys = {"billing": "secret"}
+    max_body_size = 1024
+
+
+async def make_client(aiohttp_client):
+    async def view(request):
+        body = await request.read()
+        return web.json_response({"user": request.user, "body": body.decode()})
+
+    app = web.Application()
+    app.router.add_post("/orders", view)
+    ServiceAuth.setup(app)
+    return await aiohttp_client(app)
+
+
+def signed_headers(body=b"", path="/orders?page=1", **kwargs):
+    headers = {"Content-Type": "application/json"}
+    headers["Authorization"] = sign_request(
+        "billing",
+        b"secret",
+        "POST",
+        path,
+        headers=headers,
+        body=body,
+        signed_headers=ServiceAuth.signed_headers,
+        **kwargs,
+    )
+    return headers
+
+
+async def test_hmac_auth_verifies_signed_requests_and_keeps_the_body(aiohttp_client):
+    client = await make_client(aiohttp_client)
+    body = b'{"amount": 10}'
+
+    resp = await client.post("/orders?page=1", data=body, headers=signed_headers(body))
+
+    assert resp.status == 200
+    assert await resp.json() == {"user": {"key_id": "billing"}, "body": body.decode()}
+
+
+async def test_hmac_auth_rejects_replayed_requests(aiohttp_client):
+    client = await make_client(aiohttp_client)
+    headers = signed_headers(b"{}")
+
+    first = await client.post("/orders?page=1", data=b"{}", headers=headers)
+    replayed = await client.post("/orders?page=1", data=b"{}", headers=headers)
+
+    assert first.status == 200
+    assert replayed.status == 401
+
+
+async def test_hmac_auth_rejects_altered_requests(aiohttp_client):
+    client = await make_client(aiohttp_client)
+    headers = signed_headers(b"{}")
+
+    altered_body = await client.post("/orders?page=1", data=b"[]", headers=headers)
+    altered_path = await client.post("/orders?page=2", data=b"{}", headers=headers)
+
+    assert altered_body.status == 401
+    assert altered_path.status == 401
+
+
+async def test_hmac_auth_rejects_stale_and_unknown_signatures(aiohttp_client):
+    client = await make_client(aiohttp_client)
+    stale = signed_headers(timestamp=time.time() - 600)
+    unknown = signed_headers()
+    unknown["Authorization"] = unknown["Authorization"].replace("billing", "other")
+
+    resp = await client.post("/orders?page=1", headers=stale)
+    assert resp.status == 401
+    assert (await resp.json())["type"].endswith("#TokenExpiredException")
+
+    resp = await client.post("/orders?page=1", headers=unknown)
+    assert resp.status == 401
+
+
+async def test_hmac_auth_limits_the_body_size(aiohttp_client):
+    client = await make_client(aiohttp_client)
+    body = b"x" * 2048
+
+    resp = await client.post("/orders?page=1", data=body, headers=signed_headers(body))
+
+    assert resp.status == 413
+
+
+async def test_hmac_auth_rejects_non_ascii_signatures(aiohttp_client):
+    client = await make_client(aiohttp_client)
+    headers = signed_headers()
+    authorization, _, _ = headers["Authorization"].rpartition("=")
+    headers["Authorization"] = f"{authorization}=é".encode().decode("latin-1")
+
+    resp = await client.post("/orders?page=1", headers=headers)
+
+    assert resp.status == 401
+
+
+async def test_hmac_auth_buffers_chunked_bodies_for_the_handler(aiohttp_client):
+    client = await make_client(aiohttp_client)
+    body = b'{"amount": 10}'
+
+    async def chunks(data):
+        half = len(data) // 2
+        yield data[:half]
+        yield data[half:]
+
+    resp = await client.post(
+        "/orders?page=1", data=chunks(body), headers=signed_headers(body)
+    )
+    assert resp.status == 200
+    assert (await resp.json())["body"] == body.decode()
+
+    large = b"x" * 2048
+    resp = await client.post(
+        "/orders?page=1", data=chunks(large), headers=signed_headers(large)
+    )
+    assert resp.status == 413
@@ -0,0 +1,169 @@
+import base64
+from unittest.mock import patch
+
+from aiohttp import web
+from asynctest import CoroutineMock
+
+from aegis import BasicAuth, JWTAuth
+from aegis.throttling import SlidingWindowThrottle
+
+
+async def test_throttle_blocks_keys_over_the_limit():
+    throttle = SlidingWindowThrottle(limit=2, window=60)
+
+    throttle.record_failure(["a"])
+    assert not throttle.is_blocked(["a"])
+
+    throttle.record_failure(["a"])
+    assert throttle.is_blocked(["a"])
+    assert throttle.is_blocked(["b", "a"])
+    assert not throttle.is_blocked(["b"])
+
+
+async def test_throttle_slides_the_previous_window_out():
+    throttle = SlidingWindowThrottle(limit=2, window=10)
+
+    with patch("aegis.throttling.time.monotonic", return_value=100):
+        throttle.record_failure(["a"])
+        throttle.record_failure(["a"])
+
+    assert throttle.count("a", now=105) == 2
+    assert throttle.count("a", now=115) == 1
+    assert throttle.count("a", now=121) == 0
+
+
+async def test_throttle_evicts_idle_and_least_recently_failed_keys():
+    throttle = SlidingWindowThrottle(window=10, maxsize=2)
+
+    with patch("aegis.throttling.time.monotonic", return_value=100):
+        throttle.record_failure(["a"])
+    with patch("aegis.throttling.time.monotonic", return_value=105):
+        throttle.record_failure(["b"])
+        throttle.record_failure(["c"])
+
+    assert list(throttle._counters) == ["b", "c"]
+
+    with patch("aegis.throttling.time.monotonic", return_value=130):
+        throttle.record_failure(["d"])
+
+    assert list(throttle._counters) == ["d"]
+
+
+async def test_throttle_tracks_the_kinds_of_its_keys():
+    throttle = SlidingWindowThrottle(limit=2, window=60, maxsize=1)
+    assert not throttle.tracks("user")
+
+    throttle.record_failure([("user", "1")])
+    assert throttle.tracks("user")
+
+    throttle.record_failure([("address", "::1")])
+    assert not throttle.tracks("user")
+    assert throttle.tracks("address")
+
+    throttle.reset([("address", "::1")])
+    assert not throttle.tracks("address")
+
+
+async def test_basic_auth_claims_the_user_of_the_header():
+    class TestBasicAuth(BasicAuth):
+        async def authenticate(self, request):
+            pass
+
+    authenticator = TestBasicAuth()
+    header = "Basic " + base64.b64encode(b"user:password").decode()
+
+    assert authenticator.get_claimed_user(header) == "user"
+    assert authenticator.get_claimed_user("Basic !!") is None
+
+
+class ThrottledJWTAuth(JWTAuth):
+    jwt_secret = "secret"
+    throttle = None
+
+    async def authenticate(self, request):
+        return None
+
+
+async def make_client(aiohttp_client):
+    async def view(request):
+        return web.json_response({})
+
+    app = web.Application()
+    app.router.add_get("/", view)
+    throttle = ThrottledJWTAuth.throttle = SlidingWindowThrottle(limit=2, window=60)
+    try:
+        ThrottledJWTAuth.setup(app)
+    finally:
+        ThrottledJWTAuth.throttle = None
+    return await aiohttp_client(app), throttle
+
+
+async def test_middleware_rejects_throttled_clients_before_decoding(aiohttp_client):
+    client, _ = await make_client(aiohttp_client)
+    authenticator = client.server.app["authenticator"]
+    decode = authenticator.decode = CoroutineMock(side_effect=authenticator.decode)
+    headers = {"Authorization": "Bearer invalid"}
+
+    for _ in range(2):
+        resp = await client.get("/", headers=headers)
+        assert resp.status == 401
+
+    resp = await client.get("/", headers=headers)
+    assert resp.status == 429
+    assert resp.headers["Retry-After"] == "60"
+    assert decode.await_count == 2
+
+    # the address is throttled for valid tokens as well
+    token = await authenticator.encode({"user_id": 1})
+    resp = await client.get("/", headers={"Authorization": f"Bearer {token}"})
+    assert resp.status == 429
+
+
+async def test_middleware_throttles_the_claimed_user(aiohttp_client):
+    client, throttle = await make_client(aiohttp_client)
+    authenticator = client.server.app["authenticator"]
+    token = await authenticator.encode({"user_id": 1})
+    forged = token[:-4] + ("AAAA" if not token.endswith("AAAA") else "BBBB")
+
+    for _ in range(2):
+        await client.get("/", headers={"Authorization": f"Bearer {forged}"})
+
+    assert throttle.count(("user", "1")) == 2
+    assert authenticator.get_claimed_user(f"Bearer {forged}") == "1"
+
+    # blocked by the user once the address is let through again
+    throttle.reset([("address", "127.0.0.1")])
+    resp = await client.get("/", headers={"Authorization": f"Bearer {token}"})
+    assert resp.status == 429
+    other = await authenticator.encode({"user_id": 2})
+    resp = await client.get("/", headers={"Authorization": f"Bearer {other}"})
+    assert resp.status == 200
+
+
+async def test_middleware_skips_the_claimed_user_without_user_counters(
+    aiohttp_client,
+):
+    client, _ = await make_client(aiohttp_client)
+    authenticator = client.server.app["authenticator"]
+    token = await authenticator.encode({"user_id": 1})
+
+    with patch.object(
+        authenticator, "get_claimed_user", wraps=authenticator.get_claimed_user
+    ) as get_claimed_user:
+        resp = await client.get("/", headers={"Authorization": f"Bearer {token}"})
+        assert resp.status == 200
+        get_claimed_user.assert_not_called()
+
+        resp = await client.get("/", headers={"Authorization": "Bearer invalid"})
+        assert resp.status == 401
+        get_claimed_user.assert_called_once()
+
+
+async def test_auth_route_throttles_failed_logins(aiohttp_client):
+    client, _ = await make_client(aiohttp_client)
+
+    responses = [await client.post("/auth") for _ in range(3)]
+
+    assert [resp.status for resp in responses] == [401, 401, 429]
+    assert "Retry-After" not in responses[0].headers
+    assert responses[2].headers["Retry-After"] == "60"